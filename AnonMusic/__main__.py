@@ -7,9 +7,24 @@ from pytgcalls.exceptions import NoActiveGroupCall
 import config
 from AnonMusic import LOGGER, app, userbot
 from AnonMusic.core.call import Anony
+from AnonMusic.core.http import http_client
+from AnonMusic.core.indexes import indexes
+from AnonMusic.core.storage import storage
+from AnonMusic.core.ytdlp import playlists, ytdlp
 from AnonMusic.misc import sudo
 from AnonMusic.plugins import ALL_MODULES
-from AnonMusic.utils.database import get_banned_users, get_gbanned
+from AnonMusic.utils.database import (
+    flush_served,
+    get_banned_users,
+    get_gbanned,
+    load_bans,
+    load_on_off,
+    migrate_chat_settings,
+)
+from AnonMusic.utils.loopmonitor import loop_monitor
+from AnonMusic.utils.stream.autoclear import media_cache
+from AnonMusic.utils.stream.snapshot import queue_snapshots
+from AnonMusic.utils.thumbnails import shutdown_render_pool
 from config import BANNED_USERS, COOKIES_URL
 from AnonMusic.plugins.sudo.cookies import set_cookies
 
@@ -23,7 +38,13 @@ async def init():
     ):
         LOGGER(__name__).error("⚙️ Assistant client variables not defined, exiting...")
         exit()
+    loop_monitor.start()
     await sudo()
+    await migrate_chat_settings()
+    await indexes.ensure()
+    await load_on_off()
+    await load_bans()
+    media_cache.load()
     try:
         users = await get_gbanned()
         for user_id in users:
@@ -52,8 +73,19 @@ async def init():
     res = await set_cookies(COOKIES_URL)
     LOGGER("AnonMusic").info(f"{res}")
     await Anony.decorators()
+    if config.QUEUE_SNAPSHOT_INTERVAL > 0:
+        asyncio.create_task(queue_snapshots.restore())
     await idle()
     await app.stop()
+    await queue_snapshots.save()
+    await flush_served()
+    await http_client.close()
+    ytdlp.shutdown()
+    playlists.shutdown()
+    shutdown_render_pool()
+    media_cache.save()
+    if config.DATABASE_BACKEND == "sqlite":
+        storage.close()
     LOGGER("AnonMusic").info("🚫 Stopping AnonX Music Bot...")
 
 
@@ -4,6 +4,7 @@ from datetime import datetime, timedelta
 from typing import Union
 
 from pyrogram import Client
+from pyrogram.errors import RPCError
 from pyrogram.types import InlineKeyboardMarkup
 from pytgcalls import PyTgCalls
 from pytgcalls.exceptions import (
@@ -16,12 +17,12 @@ from pytgcalls.types import AudioQuality, VideoQuality
 from pytgcalls.types import MediaStream,ChatUpdate
 
 import config
-from config import autoclean
 from AnonMusic import LOGGER, YouTube, app
 from AnonMusic.misc import db
 from AnonMusic.utils.database import (
     add_active_chat,
     add_active_video_chat,
+    get_assistant_number,
     get_lang,
     get_loop,
     group_assistant,
@@ -34,7 +35,11 @@ from AnonMusic.utils.database import (
 from AnonMusic.utils.exceptions import AssistantErr
 from AnonMusic.utils.formatters import check_duration, seconds_to_min, speed_converter
 from AnonMusic.utils.inline.play import stream_markup
-from AnonMusic.utils.thumbnails import get_thumb
+from AnonMusic.utils.scheduler import assistant_scheduler
+from AnonMusic.utils.stream.autoclear import auto_clean
+from AnonMusic.utils.stream.prefetch import prefetcher
+from AnonMusic.utils.fileids import send_photo
+from AnonMusic.utils.thumbnails import now_playing_thumb, upgrade_thumb
 from strings import get_string
 
 #=×=×=×=×=×=×=×=×=×=×=×=×=×=×=×=×[ NO NEED COOKIES ]=×=×=×=×=×=×=×=×=×=×=×=×=×=×=×=×=×=×=×=×=×=×=×
@@ -59,8 +64,45 @@ autoend = {}
 counter = {}
 
 
+def media_stream(
+    link,
+    video: Union[bool, str] = None,
+    growing: Union[bool, str] = None,
+    seek: int = 0,
+    duration: int = 0,
+) -> MediaStream:
+    # For a file still being downloaded, -follow keeps ffmpeg reading at EOF
+    # instead of ending the track. It keeps waiting after the download has
+    # finished too, so -t ends the track at its known duration and
+    # -rw_timeout only fires when no new data has arrived for
+    # PROGRESSIVE_STALL seconds.
+    parameters = []
+    if seek:
+        parameters.append(f"-ss {seek}")
+    if growing:
+        parameters.append(f"-follow 1 -rw_timeout {config.PROGRESSIVE_STALL * 1000000}")
+        if duration > seek:
+            parameters.append(f"-t {duration - seek}")
+    ffmpeg_parameters = " ".join(parameters) or None
+    if video:
+        return MediaStream(
+            link,
+            audio_parameters=AudioQuality.HIGH,
+            video_parameters=VideoQuality.SD_480p,
+            ffmpeg_parameters=ffmpeg_parameters,
+        )
+    return MediaStream(
+        link,
+        audio_parameters=AudioQuality.HIGH,
+        video_flags=MediaStream.Flags.IGNORE,
+        ffmpeg_parameters=ffmpeg_parameters,
+    )
+
+
 async def _clear_(chat_id):
     db[chat_id] = []
+    prefetcher.cancel(chat_id)
+    assistant_scheduler.left(chat_id)
     await remove_active_video_chat(chat_id)
     await remove_active_chat(chat_id)
 
@@ -243,6 +285,7 @@ class Call(PyTgCalls):
             check.pop(0)
         except:
             pass
+        assistant_scheduler.left(chat_id)
         await remove_active_video_chat(chat_id)
         await remove_active_chat(chat_id)
         try:
@@ -306,27 +349,13 @@ class Call(PyTgCalls):
         link,
         video: Union[bool, str] = None,
         image: Union[bool, str] = None,
+        growing: Union[bool, str] = None,
+        duration: int = 0,
     ):
         assistant = await group_assistant(self, chat_id)
         language = await get_lang(chat_id)
         _ = get_string(language)
-        if video:
-            stream= MediaStream(
-                link,
-                audio_parameters=AudioQuality.HIGH,video_parameters=VideoQuality.SD_480p
-                )
-
-        else:
-            stream = (
-                MediaStream(
-                    link,
-                    audio_parameters=AudioQuality.HIGH,
-                    video_parameters=VideoQuality.SD_480p,
-                    
-                )
-                if video
-                else MediaStream(link, audio_parameters=AudioQuality.HIGH,video_flags=MediaStream.Flags.IGNORE)
-            )
+        stream = media_stream(link, video, growing, duration=duration)
         try:
             await assistant.play(
                 chat_id,
@@ -337,6 +366,21 @@ class Call(PyTgCalls):
             raise AssistantErr(_["call_8"])
         except TelegramServerError:
             raise AssistantErr(_["call_10"])
+        except Exception as e:
+            if not growing:
+                if isinstance(e, RPCError):
+                    # Telegram turned the assistant away; ffmpeg and file
+                    # errors say nothing about its health.
+                    assistant_scheduler.record_error(await get_assistant_number(chat_id), e)
+                raise
+            # Could not start from the partial file, wait for the whole download.
+            link = await YouTube.complete(link)
+            if not link:
+                raise AssistantErr(_["play_14"])
+            return await self.join_call(
+                chat_id, original_chat_id, link, video=video, image=image
+            )
+        assistant_scheduler.joined(await get_assistant_number(chat_id), chat_id)
         await add_active_chat(chat_id)
         await music_on(chat_id)
         if video:
@@ -347,6 +391,16 @@ class Call(PyTgCalls):
             if users == 1:
                 autoend[chat_id] = datetime.now() + timedelta(minutes=1)
 
+    async def resume_call(self, chat_id: int, link, video: Union[bool, str] = None, seek: int = 0):
+        """Rejoin a call restored from a queue snapshot, `seek` seconds in."""
+        assistant = await group_assistant(self, chat_id)
+        await assistant.play(chat_id, media_stream(link, video, seek=seek))
+        assistant_scheduler.joined(await get_assistant_number(chat_id), chat_id)
+        await add_active_chat(chat_id)
+        await music_on(chat_id)
+        if video:
+            await add_active_video_chat(chat_id)
+
     async def change_stream(self, client, chat_id):
         check = db.get(chat_id)
         popped = None
@@ -358,8 +412,7 @@ class Call(PyTgCalls):
                 loop = loop - 1
                 await set_loop(chat_id, loop)
             if popped:
-                rem = popped["file"]
-                autoclean.remove(rem)
+                await auto_clean(popped)
             if not check:
                 await _clear_(chat_id)
                 return await client.leave_call(chat_id)
@@ -370,6 +423,7 @@ class Call(PyTgCalls):
             except:
                 return
         else:
+            prefetcher.refresh(chat_id)
             queued = check[0]["file"]
             language = await get_lang(chat_id)
             _ = get_string(language)
@@ -413,9 +467,10 @@ class Call(PyTgCalls):
                         original_chat_id,
                         text=_["call_6"],
                     )
-                img = await get_thumb(videoid)
+                img, pending = await now_playing_thumb(videoid)
                 button = stream_markup(_, chat_id)
-                run = await app.send_photo(
+                run = await send_photo(
+                    app.send_photo,
                     chat_id=original_chat_id,
                     photo=img,
                     caption=_["stream_1"].format(
@@ -427,43 +482,51 @@ class Call(PyTgCalls):
                     reply_markup=InlineKeyboardMarkup(button),
                 )
                 db[chat_id][0]["mystic"] = run
+                upgrade_thumb(run, pending)
                 db[chat_id][0]["markup"] = "tg"
             elif "vid_" in queued:
-                mystic = await app.send_message(original_chat_id, _["call_7"])
+                # Prefetched tracks are already on disk, skip the downloading notice.
+                mystic = None
+                if not YouTube.cached(videoid, video):
+                    mystic = await app.send_message(original_chat_id, _["call_7"])
                 try:
-                    file_path, direct = await YouTube.download(
+                    file_path, growing = await YouTube.progressive(
                         videoid,
-                        mystic,
+                        check[0]["seconds"],
                         videoid=True,
-                        video=True if str(streamtype) == "video" else False,
+                        video=video,
                     )
                 except:
-                    return await mystic.edit_text(
-                        _["call_6"], disable_web_page_preview=True
-                    )
-                if video:
-                    stream = MediaStream(
-                        file_path,
-                        audio_parameters=AudioQuality.HIGH,
-                        video_parameters=VideoQuality.SD_480p,
-                    )
-                else:
-                    stream = MediaStream(
-                        file_path,
-                        audio_parameters=AudioQuality.HIGH,
-                        video_flags=MediaStream.Flags.IGNORE
-                    )
+                    file_path = None
+                if not file_path:
+                    if mystic:
+                        return await mystic.edit_text(
+                            _["call_6"], disable_web_page_preview=True
+                        )
+                    return await app.send_message(original_chat_id, text=_["call_6"])
                 try:
-                    await client.play(chat_id, stream)
-                except:
-                    return await app.send_message(
-                        original_chat_id,
-                        text=_["call_6"],
+                    await client.play(
+                        chat_id,
+                        media_stream(file_path, video, growing, duration=check[0]["seconds"]),
                     )
-                img = await get_thumb(videoid)
+                except:
+                    try:
+                        if not growing:
+                            raise
+                        # Could not start from the partial file, wait for the whole download.
+                        file_path = await YouTube.complete(file_path)
+                        await client.play(chat_id, media_stream(file_path, video))
+                    except:
+                        return await app.send_message(
+                            original_chat_id,
+                            text=_["call_6"],
+                        )
+                img, pending = await now_playing_thumb(videoid)
                 button = stream_markup(_, chat_id)
-                await mystic.delete()
-                run = await app.send_photo(
+                if mystic:
+                    await mystic.delete()
+                run = await send_photo(
+                    app.send_photo,
                     chat_id=original_chat_id,
                     photo=img,
                     caption=_["stream_1"].format(
@@ -475,6 +538,7 @@ class Call(PyTgCalls):
                     reply_markup=InlineKeyboardMarkup(button),
                 )
                 db[chat_id][0]["mystic"] = run
+                upgrade_thumb(run, pending)
                 db[chat_id][0]["markup"] = "stream"
             elif "index_" in queued:
                 stream = (
@@ -494,7 +558,8 @@ class Call(PyTgCalls):
                         text=_["call_6"],
                     )
                 button = stream_markup(_, chat_id)
-                run = await app.send_photo(
+                run = await send_photo(
+                    app.send_photo,
                     chat_id=original_chat_id,
                     photo=config.STREAM_IMG_URL,
                     caption=_["stream_2"].format(user),
@@ -524,7 +589,8 @@ class Call(PyTgCalls):
                     )
                 if videoid == "telegram":
                     button = stream_markup(_, chat_id)
-                    run = await app.send_photo(
+                    run = await send_photo(
+                        app.send_photo,
                         chat_id=original_chat_id,
                         photo=config.TELEGRAM_AUDIO_URL
                         if str(streamtype) == "audio"
@@ -538,7 +604,8 @@ class Call(PyTgCalls):
                     db[chat_id][0]["markup"] = "tg"
                 elif videoid == "soundcloud":
                     button = stream_markup(_, chat_id)
-                    run = await app.send_photo(
+                    run = await send_photo(
+                        app.send_photo,
                         chat_id=original_chat_id,
                         photo=config.SOUNCLOUD_IMG_URL,
                         caption=_["stream_1"].format(
@@ -549,9 +616,10 @@ class Call(PyTgCalls):
                     db[chat_id][0]["mystic"] = run
                     db[chat_id][0]["markup"] = "tg"
                 else:
-                    img = await get_thumb(videoid)
+                    img, pending = await now_playing_thumb(videoid)
                     button = stream_markup(_, chat_id)
-                    run = await app.send_photo(
+                    run = await send_photo(
+                        app.send_photo,
                         chat_id=original_chat_id,
                         photo=img,
                         caption=_["stream_1"].format(
@@ -563,6 +631,7 @@ class Call(PyTgCalls):
                         reply_markup=InlineKeyboardMarkup(button),
                     )
                     db[chat_id][0]["mystic"] = run
+                    upgrade_thumb(run, pending)
                     db[chat_id][0]["markup"] = "stream"
 
     async def ping(self):
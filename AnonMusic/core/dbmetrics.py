@@ -0,0 +1,180 @@
+import contextvars
+import functools
+import time
+
+# Upper bounds in milliseconds; the last bucket catches everything slower.
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf"))
+TIMED_OPS = {
+    "bulk_write",
+    "count_documents",
+    "create_index",
+    "delete_many",
+    "delete_one",
+    "estimated_document_count",
+    "find_one",
+    "insert_one",
+    "update_one",
+}
+CURSOR_OPS = {"aggregate", "find"}
+
+_scope = contextvars.ContextVar("dbmetrics_scope", default=None)
+
+
+class _Scope:
+    """Storage operations issued while an instrumented function runs."""
+
+    __slots__ = ("ops", "parent")
+
+    def __init__(self, parent):
+        self.ops = 0
+        self.parent = parent
+
+
+def _touch():
+    scope = _scope.get()
+    while scope is not None:
+        scope.ops += 1
+        scope = scope.parent
+
+
+class OpStats:
+    __slots__ = ("calls", "hits", "errors", "total", "max", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def record(self, ms: float, hit: bool, failed: bool):
+        self.calls += 1
+        self.hits += hit
+        self.errors += failed
+        self.total += ms
+        self.max = max(self.max, ms)
+        for i, bound in enumerate(BUCKETS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                break
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding the pct-th call (max for the last one)."""
+        wanted = self.calls * pct / 100
+        seen = 0
+        for bound, count in zip(BUCKETS, self.buckets):
+            seen += count
+            if count and seen >= wanted:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "calls": self.calls,
+            "avg": round(self.total / self.calls, 2) if self.calls else 0,
+            "p50": round(self.percentile(50), 2),
+            "p95": round(self.percentile(95), 2),
+            "max": round(self.max, 2),
+            "total": round(self.total, 2),
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / self.calls * 100, 2) if self.calls else 0,
+        }
+
+
+class _TimedCollection:
+    def __init__(self, metrics: "DBMetrics", collection, name: str):
+        self._metrics = metrics
+        self._collection = collection
+        self._name = name
+        self._wrapped = {}
+
+    def __getattr__(self, attr: str):
+        if attr in self._wrapped:
+            return self._wrapped[attr]
+        value = getattr(self._collection, attr)
+        if attr in TIMED_OPS:
+            wrapped = self._metrics.timed(f"{self._name}.{attr}", value, self._metrics.storage, storage_op=True)
+            self._wrapped[attr] = wrapped
+            return wrapped
+        if attr in CURSOR_OPS:
+
+            @functools.wraps(value)
+            def cursor(*args, **kwargs):
+                # Cursors are consumed by the caller; only count the access here.
+                _touch()
+                return value(*args, **kwargs)
+
+            return cursor
+        return value
+
+
+class _TimedDatabase:
+    def __init__(self, metrics: "DBMetrics", database):
+        self._metrics = metrics
+        self._database = database
+
+    def __getitem__(self, name: str) -> _TimedCollection:
+        return _TimedCollection(self._metrics, self._database[name], name)
+
+    def __getattr__(self, name: str):
+        value = getattr(self._database, name)
+        if hasattr(value, "find_one"):
+            return _TimedCollection(self._metrics, value, name)
+        if name == "command":
+            return self._metrics.timed("command", value, self._metrics.storage, storage_op=True)
+        return value
+
+
+class DBMetrics:
+    """Latency histograms for utils/database.py functions and raw storage calls.
+
+    A function call counts as a cache hit when it returned without issuing
+    any storage operation, including through the functions it called.
+    """
+
+    def __init__(self):
+        self.functions = {}
+        self.storage = {}
+        self.started = time.monotonic()
+
+    def timed(self, name: str, func, table: dict, storage_op: bool = False):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if storage_op:
+                _touch()
+            scope = _Scope(_scope.get())
+            token = _scope.set(scope)
+            failed = True
+            start = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                ms = (time.perf_counter() - start) * 1000
+                _scope.reset(token)
+                stats = table.get(name)
+                if stats is None:
+                    stats = table[name] = OpStats()
+                stats.record(ms, not storage_op and not scope.ops, failed)
+
+        return wrapper
+
+    def instrument(self, func):
+        return self.timed(func.__name__, func, self.functions)
+
+    def track(self, database) -> _TimedDatabase:
+        return _TimedDatabase(self, database)
+
+    def slowest(self, table: dict, limit: int = 10, key: str = "p95") -> list:
+        rows = [(name, stats.summary()) for name, stats in table.items()]
+        return sorted(rows, key=lambda row: (row[1][key], row[1]["avg"]), reverse=True)[:limit]
+
+    def reset(self):
+        self.functions.clear()
+        self.storage.clear()
+        self.started = time.monotonic()
+
+
+db_metrics = DBMetrics()
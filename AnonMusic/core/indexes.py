@@ -0,0 +1,120 @@
+from pymongo.errors import OperationFailure
+
+from ..logging import LOGGER
+from .storage import storage
+
+# collection -> [(key, unique)]; every lookup in utils/database.py is by one field.
+INDEXES = {
+    "afk": [("user_id", True)],
+    "authuser": [("chat_id", True)],
+    "autoend": [("chat_id", True)],
+    "blacklistChat": [("chat_id", True)],
+    "blockedusers": [("user_id", True)],
+    "chats": [("chat_id", True)],
+    "chatsettings": [("chat_id", True)],
+    "fileids": [("key", True)],
+    "gban": [("user_id", True)],
+    "migrations": [("name", True)],
+    "onoffper": [("on_off", True)],
+    "queues": [("chat_id", True)],
+    "sudoers": [("sudo", True)],
+    "tgusersdb": [("user_id", True)],
+}
+
+# name -> (collection, filter, sort) for the queries run on every update or play.
+HOT_QUERIES = {
+    "served_user": ("tgusersdb", {"user_id": 1}, None),
+    "served_users_page": ("tgusersdb", {"user_id": {"$gt": 0}}, {"user_id": 1}),
+    "served_chat": ("chats", {"chat_id": -1}, None),
+    "served_chats_page": ("chats", {"chat_id": {"$lt": 0}}, {"chat_id": 1}),
+    "chat_settings": ("chatsettings", {"chat_id": -1}, None),
+    "file_id": ("fileids", {"key": ""}, None),
+    "afk_user": ("afk", {"user_id": 1}, None),
+}
+
+
+def _index_name(key: str) -> str:
+    return f"{key}_1"
+
+
+def _summarize(plan: dict) -> str:
+    if "queryPlan" in plan:
+        # Slot-based engine wraps the classic plan tree.
+        return _summarize(plan["queryPlan"])
+    stage = plan.get("stage", "?")
+    if plan.get("indexName"):
+        stage += f"({plan['indexName']})"
+    children = plan.get("inputStages") or ([plan["inputStage"]] if "inputStage" in plan else [])
+    if not children:
+        return stage
+    return stage + " > " + ", ".join(_summarize(child) for child in children)
+
+
+class IndexManager:
+    """Create the indexes in INDEXES on startup and report on their use.
+
+    `ensure` is idempotent: indexes that already exist are skipped, so it
+    runs on every boot. A unique index that cannot be built
+    because old documents hold duplicates is created as a plain one instead
+    and listed under `degraded`.
+    """
+
+    def __init__(self):
+        self.created = 0
+        self.degraded = []
+
+    async def ensure(self):
+        existing = {}
+        for name in INDEXES:
+            existing[name] = {
+                index["name"] async for index in storage[name].list_indexes()
+            }
+        for name, specs in INDEXES.items():
+            for key, unique in specs:
+                if _index_name(key) in existing[name]:
+                    continue
+                try:
+                    await storage[name].create_index(key, unique=unique)
+                except OperationFailure as e:
+                    if not unique:
+                        raise
+                    LOGGER(__name__).warning(
+                        f"Unique index on {name}.{key} failed ({e.code}), creating a plain one."
+                    )
+                    await storage[name].create_index(key)
+                    self.degraded.append(f"{name}.{key}")
+                self.created += 1
+        if self.created:
+            LOGGER(__name__).info(f"🗃️ Created {self.created} database index(es).")
+
+    async def report(self) -> dict:
+        """Missing indexes, and indexes with no recorded use since the server started."""
+        missing, unused = [], []
+        for name, specs in INDEXES.items():
+            names = {index["name"] async for index in storage[name].list_indexes()}
+            missing += [f"{name}.{key}" for key, _ in specs if _index_name(key) not in names]
+            try:
+                async for stat in storage[name].aggregate([{"$indexStats": {}}]):
+                    if stat["name"] != "_id_" and not stat["accesses"]["ops"]:
+                        unused.append(f"{name}.{stat['name']}")
+            except OperationFailure:
+                # $indexStats needs a role some hosted tiers do not grant.
+                pass
+        return {"missing": missing, "unused": unused, "degraded": self.degraded}
+
+    async def explain(self) -> dict:
+        """Winning plan of each HOT_QUERIES entry, e.g. `LIMIT > FETCH > IXSCAN(chat_id_1)`."""
+        plans = {}
+        for query, (name, spec, sort) in HOT_QUERIES.items():
+            find = {"find": name, "filter": spec, "limit": 1}
+            if sort:
+                find["sort"] = sort
+            try:
+                result = await storage.command({"explain": find, "verbosity": "queryPlanner"})
+                plans[query] = _summarize(result["queryPlanner"]["winningPlan"])
+            except OperationFailure as e:
+                plans[query] = f"failed: {e.code}"
+        return plans
+
+
+indexes = IndexManager()
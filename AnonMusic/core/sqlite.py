@@ -0,0 +1,334 @@
+import asyncio
+import json
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from pymongo.results import BulkWriteResult, DeleteResult, InsertOneResult, UpdateResult
+
+COMPARISONS = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<=", "$ne": "!="}
+FIELD = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+FETCH_SIZE = 500
+
+
+def _path(key: str) -> str:
+    if not FIELD.match(key):
+        raise OperationFailure(f"Field {key!r} is not supported by the SQLite backend")
+    return f"json_extract(doc, '$.{key}')"
+
+
+def _bind(value):
+    return int(value) if isinstance(value, bool) else value
+
+
+def _where(spec: dict) -> tuple:
+    """Translate the filter subset the bot uses: equality and $gt/$lt/$in style ranges."""
+    clauses, params = [], []
+    for key, cond in (spec or {}).items():
+        path = _path(key)
+        if isinstance(cond, dict):
+            for op, value in cond.items():
+                if op == "$in":
+                    clauses.append(f"{path} IN ({', '.join('?' * len(value)) or 'NULL'})")
+                    params += [_bind(v) for v in value]
+                elif op in COMPARISONS:
+                    clauses.append(f"{path} {COMPARISONS[op]} ?")
+                    params.append(_bind(value))
+                else:
+                    raise OperationFailure(f"{op} is not supported by the SQLite backend")
+        elif cond is None:
+            clauses.append(f"{path} IS NULL")
+        else:
+            clauses.append(f"{path} = ?")
+            params.append(_bind(cond))
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _load(row: tuple) -> dict:
+    doc = json.loads(row[1])
+    doc["_id"] = row[0]
+    return doc
+
+
+def _dump(doc: dict) -> str:
+    return json.dumps({k: v for k, v in doc.items() if k != "_id"}, default=str)
+
+
+def _project(doc: dict, projection: dict) -> dict:
+    if not projection:
+        return doc
+    include = [k for k, v in projection.items() if v and k != "_id"]
+    if include:
+        out = {k: doc[k] for k in include if k in doc}
+        if projection.get("_id", 1):
+            out["_id"] = doc["_id"]
+        return out
+    return {k: v for k, v in doc.items() if k not in projection}
+
+
+def _apply(doc: dict, update: dict, inserting: bool) -> dict:
+    for op, values in update.items():
+        if op == "$set" or (op == "$setOnInsert" and inserting):
+            doc.update(values)
+        elif op == "$unset":
+            for key in values:
+                doc.pop(key, None)
+        elif op == "$inc":
+            for key, step in values.items():
+                doc[key] = doc.get(key, 0) + step
+        elif op != "$setOnInsert":
+            raise OperationFailure(f"{op} is not supported by the SQLite backend")
+    return doc
+
+
+class SQLiteCursor:
+    """Lazy `find` result supporting sort/skip/limit, `async for` and `to_list`."""
+
+    def __init__(self, collection: "SQLiteCollection", spec: dict, projection: dict):
+        self._collection = collection
+        self._spec = spec
+        self._projection = projection
+        self._sort = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key, direction: int = 1):
+        self._sort += key if isinstance(key, list) else [(key, direction)]
+        return self
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def _sql(self, length: int = 0) -> tuple:
+        where, params = _where(self._spec)
+        sql = f'SELECT _id, doc FROM "{self._collection.name}"{where}'
+        if self._sort:
+            order = ", ".join(
+                f"{_path(key)} {'DESC' if direction < 0 else 'ASC'}" for key, direction in self._sort
+            )
+            sql += f" ORDER BY {order}"
+        limit = min(n for n in (self._limit, length) if n) if self._limit or length else -1
+        return sql + f" LIMIT {limit} OFFSET {self._skip}", params
+
+    async def to_list(self, length: int = None) -> list:
+        sql, params = self._sql(length or 0)
+        rows = await self._collection.run(lambda conn: conn.execute(sql, params).fetchall())
+        return [_project(_load(row), self._projection) for row in rows]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        sql, params = self._sql()
+        cursor = await self._collection.run(lambda conn: conn.execute(sql, params))
+        while True:
+            rows = await self._collection.run(lambda conn: cursor.fetchmany(FETCH_SIZE))
+            if not rows:
+                return
+            for row in rows:
+                yield _project(_load(row), self._projection)
+
+
+class SQLiteCollection:
+    """One table of JSON documents, keyed by rowid, behaving like a motor collection."""
+
+    def __init__(self, database: "SQLiteDatabase", name: str):
+        self.database = database
+        self.name = name
+        self._ready = False
+
+    async def run(self, func):
+        def call(conn):
+            if not self._ready:
+                conn.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{self.name}" (_id INTEGER PRIMARY KEY, doc TEXT NOT NULL)'
+                )
+                self._ready = True
+            return func(conn)
+
+        return await self.database.run(call)
+
+    def find(self, spec: dict = None, projection: dict = None) -> SQLiteCursor:
+        return SQLiteCursor(self, spec, projection)
+
+    async def find_one(self, spec: dict = None, projection: dict = None):
+        docs = await self.find(spec, projection).to_list(1)
+        return docs[0] if docs else None
+
+    async def count_documents(self, spec: dict) -> int:
+        where, params = _where(spec)
+        sql = f'SELECT COUNT(*) FROM "{self.name}"{where}'
+        return await self.run(lambda conn: conn.execute(sql, params).fetchone()[0])
+
+    async def estimated_document_count(self) -> int:
+        return await self.count_documents({})
+
+    def _insert(self, conn, doc: dict) -> int:
+        try:
+            return conn.execute(f'INSERT INTO "{self.name}" (doc) VALUES (?)', (_dump(doc),)).lastrowid
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKeyError(str(e), 11000)
+
+    def _update(self, conn, spec: dict, update: dict, upsert: bool) -> dict:
+        where, params = _where(spec)
+        row = conn.execute(f'SELECT _id, doc FROM "{self.name}"{where} LIMIT 1', params).fetchone()
+        if row is None:
+            if not upsert:
+                return {"n": 0, "nModified": 0}
+            seed = {k: v for k, v in (spec or {}).items() if not isinstance(v, dict)}
+            return {"n": 1, "nModified": 0, "upserted": self._insert(conn, _apply(seed, update, True))}
+        try:
+            conn.execute(
+                f'UPDATE "{self.name}" SET doc = ? WHERE _id = ?',
+                (_dump(_apply(_load(row), update, False)), row[0]),
+            )
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKeyError(str(e), 11000)
+        return {"n": 1, "nModified": 1}
+
+    async def insert_one(self, doc: dict) -> InsertOneResult:
+        inserted = await self.run(lambda conn: self._insert(conn, doc))
+        return InsertOneResult(inserted, True)
+
+    async def update_one(self, spec: dict, update: dict, upsert: bool = False) -> UpdateResult:
+        raw = await self.run(lambda conn: self._update(conn, spec, update, upsert))
+        return UpdateResult(raw, True)
+
+    async def _delete(self, spec: dict, limit: int) -> DeleteResult:
+        where, params = _where(spec)
+        sql = f'DELETE FROM "{self.name}" WHERE _id IN (SELECT _id FROM "{self.name}"{where} LIMIT {limit})'
+        deleted = await self.run(lambda conn: conn.execute(sql, params).rowcount)
+        return DeleteResult({"n": deleted}, True)
+
+    async def delete_one(self, spec: dict) -> DeleteResult:
+        return await self._delete(spec, 1)
+
+    async def delete_many(self, spec: dict) -> DeleteResult:
+        return await self._delete(spec, -1)
+
+    async def bulk_write(self, requests: list, ordered: bool = True) -> BulkWriteResult:
+        """UpdateOne requests only, applied in a single transaction."""
+
+        def write(conn):
+            totals = {"nInserted": 0, "nUpserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []}
+            conn.execute("BEGIN")
+            try:
+                for index, request in enumerate(requests):
+                    raw = self._update(conn, request._filter, request._doc, request._upsert)
+                    if "upserted" in raw:
+                        totals["nUpserted"] += 1
+                        totals["upserted"].append({"index": index, "_id": raw["upserted"]})
+                    else:
+                        totals["nMatched"] += raw["n"]
+                        totals["nModified"] += raw["nModified"]
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return totals
+
+        return BulkWriteResult(await self.run(write), True)
+
+    async def create_index(self, key: str, unique: bool = False) -> str:
+        name = f"{key}_1"
+        sql = (
+            f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS "{self.name}.{name}" '
+            f'ON "{self.name}" ({_path(key)})'
+        )
+        try:
+            await self.run(lambda conn: conn.execute(sql))
+        except sqlite3.IntegrityError as e:
+            raise DuplicateKeyError(str(e), 11000)
+        return name
+
+    async def list_indexes(self):
+        sql = "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?"
+        rows = await self.run(lambda conn: conn.execute(sql, (self.name,)).fetchall())
+        yield {"name": "_id_"}
+        for (name,) in rows:
+            if name.startswith(f"{self.name}."):
+                yield {"name": name[len(self.name) + 1 :]}
+
+    def aggregate(self, pipeline: list):
+        raise OperationFailure("aggregate is not supported by the SQLite backend")
+
+
+class SQLiteDatabase:
+    """Embedded, single-file stand-in for the motor database.
+
+    Covers the calls utils/database.py, misc.sudo, core/indexes and the stats
+    plugin make. All SQL runs on one worker thread so the event loop never
+    blocks on disk and the connection is never shared between threads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._collections = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        return self._conn
+
+    async def run(self, func):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(self._connect()))
+
+    def __getitem__(self, name: str) -> SQLiteCollection:
+        if name not in self._collections:
+            self._collections[name] = SQLiteCollection(self, name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> SQLiteCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def _dbstats(self, conn) -> dict:
+        tables = [
+            name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        ]
+        objects = data = 0
+        for table in tables:
+            count, size = conn.execute(f'SELECT COUNT(*), COALESCE(SUM(LENGTH(doc)), 0) FROM "{table}"').fetchone()
+            objects += count
+            data += size
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        return {
+            "collections": len(tables),
+            "objects": objects,
+            "dataSize": data,
+            "storageSize": page_size * pages,
+        }
+
+    async def command(self, command, **kwargs) -> dict:
+        if command == "dbstats":
+            return await self.run(self._dbstats)
+        if isinstance(command, dict) and "explain" in command:
+            find = command["explain"]
+            cursor = self[find["find"]].find(find.get("filter"))
+            for key, direction in (find.get("sort") or {}).items():
+                cursor.sort(key, direction)
+            sql, params = cursor.limit(find.get("limit", 0))._sql()
+            rows = await self[find["find"]].run(
+                lambda conn: conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+            )
+            return {"queryPlanner": {"winningPlan": {"stage": " > ".join(row[-1] for row in rows)}}}
+        raise OperationFailure(f"{command} is not supported by the SQLite backend")
+
+    def close(self):
+        if self._conn is not None:
+            self._executor.submit(self._conn.close).result()
+            self._conn = None
+        self._executor.shutdown(wait=False)
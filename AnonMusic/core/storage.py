@@ -0,0 +1,17 @@
+import config
+
+from ..logging import LOGGER
+from .dbmetrics import db_metrics
+
+# Every collection is reached through `storage`: the motor database, or the
+# embedded SQLite one exposing the same calls (core/sqlite.py).
+if config.DATABASE_BACKEND == "sqlite":
+    from .sqlite import SQLiteDatabase
+
+    storage = SQLiteDatabase(config.SQLITE_DB_PATH)
+    LOGGER(__name__).info(f"🗃️ Using the embedded SQLite database at {config.SQLITE_DB_PATH}.")
+else:
+    from .mongo import mongodb as storage
+
+if config.DB_METRICS:
+    storage = db_metrics.track(storage)
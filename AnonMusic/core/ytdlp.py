@@ -0,0 +1,198 @@
+import asyncio
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator
+
+from yt_dlp import YoutubeDL
+
+import config
+from AnonMusic.utils.singleflight import SingleFlight
+from AnonMusic.utils.ttlcache import TTLCache
+from workers import extract_info
+
+from ..logging import LOGGER
+
+
+class YTDLPPool:
+    """Bounded process pool running yt-dlp extractions off the event loop.
+
+    Results are cached per URL for EXTRACT_CACHE_TTL seconds and concurrent
+    requests for the same URL share one extraction.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self.cache = TTLCache(config.EXTRACT_CACHE_SIZE, config.EXTRACT_CACHE_TTL)
+        self.flight = SingleFlight()
+        self.calls = 0
+        self.failures = 0
+        self.busy = 0.0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned, not forked: see workers.py.
+            self._executor = ProcessPoolExecutor(
+                max_workers=config.EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            LOGGER(__name__).info(
+                f"🧩 yt-dlp pool started with {config.EXTRACT_WORKERS} worker(s)."
+            )
+        return self._executor
+
+    async def _run(self, url: str, opts: dict, download: bool) -> dict:
+        self.calls += 1
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        try:
+            executor = self.executor
+            try:
+                info = await loop.run_in_executor(executor, extract_info, url, opts, download)
+            except BrokenProcessPool:
+                # A worker died (OOM kill, crashing extractor) and took the
+                # pool with it. Start a fresh one, unless a concurrent call
+                # already did, and try once more.
+                if self._executor is executor:
+                    LOGGER(__name__).warning("yt-dlp pool broke, restarting it.")
+                    self.shutdown()
+                info = await loop.run_in_executor(self.executor, extract_info, url, opts, download)
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self.busy += time.monotonic() - start
+        self.cache.set((url, download), info)
+        return info
+
+    async def extract(self, url: str, opts: dict = None, download: bool = False) -> dict:
+        """`YoutubeDL(opts).extract_info(url, download)` in a worker process."""
+        key = (url, download)
+        info = self.cache.get(key)
+        if info is not None:
+            # A downloaded file may have been evicted since it was cached.
+            filepath = (info.get("requested_downloads") or [{}])[0].get("filepath")
+            if not download or (filepath and os.path.exists(filepath)):
+                return info
+            self.cache.pop(key)
+        return await self.flight.do(key, self._run, url, opts or {}, download)
+
+    def stats(self) -> dict:
+        return {
+            "workers": config.EXTRACT_WORKERS,
+            "inflight": self.flight.stats()["inflight"],
+            "calls": self.calls,
+            "failures": self.failures,
+            "avg_time": round(self.busy / self.calls, 2) if self.calls else 0,
+            "cache": self.cache.stats(),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+
+class PlaylistEnumerator:
+    """List playlist video ids in-process, page by page, off the event loop.
+
+    Each worker thread keeps one YoutubeDL instance alive so extractors are
+    loaded once, instead of paying a yt-dlp interpreter start per playlist.
+    Ids are yielded as pages arrive and cached per playlist for
+    PLAYLIST_CACHE_TTL seconds.
+    """
+
+    opts = {
+        "quiet": True,
+        "extract_flat": "in_playlist",
+        "ignoreerrors": True,
+        "skip_download": True,
+        "lazy_playlist": True,
+    }
+
+    def __init__(self, workers: int = 2):
+        self.workers = workers
+        self._executor = None
+        self._local = threading.local()
+        self.cache = TTLCache(256, config.PLAYLIST_CACHE_TTL)
+        self.listreg = re.compile(r"list=([0-9A-Za-z_-]+)")
+        self.calls = 0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="playlist"
+            )
+        return self._executor
+
+    def _walk(self, url: str, limit: int, push, stop: threading.Event) -> bool:
+        """Push up to `limit` ids; True when the playlist ran out first."""
+        ydl = getattr(self._local, "ydl", None)
+        if ydl is None:
+            ydl = self._local.ydl = YoutubeDL(self.opts)
+        info = ydl.extract_info(url, download=False, process=False)
+        if not info:
+            return False
+        # With lazy_playlist the entries are fetched one page at a time.
+        # Private or removed videos come back empty and are skipped, so they
+        # count towards `limit` like the others.
+        for count, entry in enumerate(info.get("entries") or []):
+            if count >= limit or stop.is_set():
+                return False
+            if entry and entry.get("id"):
+                push(entry["id"])
+        return True
+
+    async def iter_ids(self, url: str, limit: int) -> AsyncIterator[str]:
+        match = self.listreg.search(url)
+        key = match.group(1) if match else url
+        cached = self.cache.get(key)
+        # (ids, whole playlist read, entries asked for)
+        if cached and (cached[1] or cached[2] >= limit):
+            for video_id in cached[0][:limit]:
+                yield video_id
+            return
+
+        self.calls += 1
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        stop = threading.Event()
+        done = object()
+
+        def push(video_id):
+            loop.call_soon_threadsafe(queue.put_nowait, video_id)
+
+        future = loop.run_in_executor(self.executor, self._walk, url, limit, push, stop)
+        future.add_done_callback(lambda _: queue.put_nowait(done))
+        ids = []
+        try:
+            while True:
+                video_id = await queue.get()
+                if video_id is done:
+                    break
+                ids.append(video_id)
+                yield video_id
+        finally:
+            # Stops the worker at the next entry if the consumer gave up early.
+            stop.set()
+        if future.exception():
+            LOGGER(__name__).warning(f"Playlist enumeration failed for {url}: {future.exception()}")
+            if not ids:
+                raise future.exception()
+            return
+        self.cache.set(key, (ids, future.result(), limit))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+
+ytdlp = YTDLPPool()
+playlists = PlaylistEnumerator()
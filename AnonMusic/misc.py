@@ -4,7 +4,7 @@ import heroku3
 from pyrogram import filters
 
 import config
-from AnonMusic.core.mongo import mongodb
+from AnonMusic.core.storage import storage
 from .logging import LOGGER
 
 # Globals
@@ -37,11 +37,11 @@ def dbb():
 
 
 async def sudo():
-    """Load or initialize sudoers list from MongoDB."""
+    """Load or initialize sudoers list from the database."""
     global SUDOERS
     try:
         SUDOERS.add(config.OWNER_ID)
-        sudoersdb = mongodb.sudoers
+        sudoersdb = storage.sudoers
 
         sudo_data = await sudoersdb.find_one({"sudo": "sudo"}) or {}
         sudoers = sudo_data.get("sudoers", [])
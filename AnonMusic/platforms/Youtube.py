@@ -1,13 +1,18 @@
 import asyncio
 import os
 import re
-from typing import Union
-import yt_dlp
+from typing import Tuple, Union
+import config
 from pyrogram.enums import MessageEntityType
 from pyrogram.types import Message
 from AnonMusic.utils.formatters import time_to_seconds
 import aiohttp
 from AnonMusic import LOGGER
+from AnonMusic.core.http import http_client
+from AnonMusic.core.ytdlp import playlists, ytdlp
+from AnonMusic.utils.singleflight import SingleFlight
+from AnonMusic.utils.ttlcache import TTLCache
+from AnonMusic.utils.stream.autoclear import media_cache
 
 try:
     from py_yt import VideosSearch
@@ -15,6 +20,13 @@ except ImportError:
     from youtubesearchpython.__future__ import VideosSearch
 
 API_URL = "https://shrutibots.site"
+DOWNLOAD_DIR = "downloads"
+CHUNK_SIZE = 16384
+DOWNLOAD_RETRIES = 3
+PROGRESSIVE_POLL = 0.5
+
+# Concurrent requests for the same (video_id, audio|video) share one download.
+downloads_flight = SingleFlight()
 
 async def download_song(link: str) -> str:
     video_id = link.split('v=')[-1].split('&')[0] if 'v=' in link else link
@@ -22,68 +34,8 @@ async def download_song(link: str) -> str:
     if not video_id or len(video_id) < 3:
         return None
 
-    DOWNLOAD_DIR = "downloads"
-    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
-    file_path = os.path.join(DOWNLOAD_DIR, f"{video_id}.mp3")
-
-    if os.path.exists(file_path):
-        return file_path
-
-    try:
-        async with aiohttp.ClientSession() as session:
-            params = {"url": video_id, "type": "audio"}
-            
-            async with session.get(
-                f"{API_URL}/download",
-                params=params,
-                timeout=aiohttp.ClientTimeout(total=7)
-            ) as response:
-                if response.status != 200:
-                    return None
-
-                data = await response.json()
-                download_token = data.get("download_token")
-                
-                if not download_token:
-                    return None
-                
-                stream_url = f"{API_URL}/stream/{video_id}?type=audio&token={download_token}"
-                
-                async with session.get(
-                    stream_url,
-                    timeout=aiohttp.ClientTimeout(total=300)
-                ) as file_response:
-                    if file_response.status == 302:
-                        redirect_url = file_response.headers.get('Location')
-                        if redirect_url:
-                            async with session.get(redirect_url) as final_response:
-                                if final_response.status != 200:
-                                    return None
-                                with open(file_path, "wb") as f:
-                                    async for chunk in final_response.content.iter_chunked(16384):
-                                        f.write(chunk)
-                                if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-                                    return file_path
-                                else:
-                                    return None
-                    elif file_response.status == 200:
-                        with open(file_path, "wb") as f:
-                            async for chunk in file_response.content.iter_chunked(16384):
-                                f.write(chunk)
-                        if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-                            return file_path
-                        else:
-                            return None
-                    else:
-                        return None
+    return await downloads_flight.do((video_id, "audio"), _download_song, video_id)
 
-    except Exception:
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except:
-                pass
-        return None
 
 async def download_video(link: str) -> str:
     video_id = link.split('v=')[-1].split('&')[0] if 'v=' in link else link
@@ -91,82 +43,123 @@ async def download_video(link: str) -> str:
     if not video_id or len(video_id) < 3:
         return None
 
-    DOWNLOAD_DIR = "downloads"
+    return await downloads_flight.do((video_id, "video"), _download_video, video_id)
+
+
+async def _download_song(video_id: str) -> str:
+    return await _download_media(video_id, "audio", "mp3", 300)
+
+
+async def _download_video(video_id: str) -> str:
+    return await _download_media(video_id, "video", "mp4", 600)
+
+
+def _range_total(content_range: str) -> Union[int, None]:
+    """Total size from a `bytes a-b/total` or `bytes */total` Content-Range."""
+    total = (content_range or "").rpartition("/")[2]
+    return int(total) if total.isdigit() else None
+
+
+def _restart_part(part_path: str, reason: str):
+    # Unlinking leaves a progressive reader's open handle intact.
+    if os.path.exists(part_path):
+        os.remove(part_path)
+    raise aiohttp.ClientPayloadError(f"{reason}, starting over")
+
+
+async def _stream_to_part(session, url: str, part_path: str, timeout: int) -> bool:
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else None
+    async with session.get(
+        url,
+        headers=headers,
+        timeout=aiohttp.ClientTimeout(total=timeout)
+    ) as response:
+        content_range = response.headers.get("Content-Range")
+        if response.status == 416 and offset:
+            # Requested range starts past the end: whole only if the sizes agree.
+            if _range_total(content_range) == offset:
+                return True
+            _restart_part(part_path, f"Partial file of {offset} bytes does not match {content_range}")
+        if response.status == 206:
+            if not (content_range or "").startswith(f"bytes {offset}-"):
+                _restart_part(part_path, f"Asked for bytes {offset}- but got {content_range}")
+            target, mode, total = part_path, "ab", _range_total(content_range)
+        elif response.status == 200:
+            # Server ignored the range. Write a fresh file rather than truncate
+            # the .part a progressive reader may be following.
+            target = f"{part_path}.new" if offset else part_path
+            mode, total = "wb", response.content_length
+        else:
+            return False
+        with open(target, mode) as f:
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                f.write(chunk)
+    size = os.path.getsize(target)
+    if total is not None and size != total:
+        if target != part_path:
+            os.remove(target)
+        if size > total:
+            _restart_part(part_path, f"Got {size} of {total} bytes")
+        raise aiohttp.ClientPayloadError(f"Got {size} of {total} bytes")
+    if target != part_path:
+        os.replace(target, part_path)
+    return True
+
+
+async def _download_media(video_id: str, media_type: str, ext: str, timeout: int) -> str:
     os.makedirs(DOWNLOAD_DIR, exist_ok=True)
-    file_path = os.path.join(DOWNLOAD_DIR, f"{video_id}.mp4")
+    file_path = os.path.join(DOWNLOAD_DIR, f"{video_id}.{ext}")
 
     if os.path.exists(file_path):
+        media_cache.record(True)
+        media_cache.touch(file_path)
         return file_path
+    media_cache.record(False)
 
-    try:
-        async with aiohttp.ClientSession() as session:
-            params = {"url": video_id, "type": "video"}
-            
-            async with session.get(
-                f"{API_URL}/download",
-                params=params,
-                timeout=aiohttp.ClientTimeout(total=7)
-            ) as response:
-                if response.status != 200:
-                    return None
-
-                data = await response.json()
-                download_token = data.get("download_token")
-                
-                if not download_token:
-                    return None
-                
-                stream_url = f"{API_URL}/stream/{video_id}?type=video&token={download_token}"
-                
-                async with session.get(
-                    stream_url,
-                    timeout=aiohttp.ClientTimeout(total=600)
-                ) as file_response:
-                    if file_response.status == 302:
-                        redirect_url = file_response.headers.get('Location')
-                        if redirect_url:
-                            async with session.get(redirect_url) as final_response:
-                                if final_response.status != 200:
-                                    return None
-                                with open(file_path, "wb") as f:
-                                    async for chunk in final_response.content.iter_chunked(16384):
-                                        f.write(chunk)
-                                if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-                                    return file_path
-                                else:
-                                    return None
-                    elif file_response.status == 200:
-                        with open(file_path, "wb") as f:
-                            async for chunk in file_response.content.iter_chunked(16384):
-                                f.write(chunk)
-                        if os.path.exists(file_path) and os.path.getsize(file_path) > 0:
-                            return file_path
-                        else:
-                            return None
-                    else:
-                        return None
+    # Data lands in a .part file first and is only renamed once complete, so a
+    # crash or timeout can never leave a truncated file behind as a cache hit.
+    part_path = f"{file_path}.part"
+    session = http_client.session
 
+    try:
+        async with session.get(
+            f"{API_URL}/download",
+            params={"url": video_id, "type": media_type},
+            timeout=aiohttp.ClientTimeout(total=7)
+        ) as response:
+            if response.status != 200:
+                return None
+            data = await response.json()
     except Exception:
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except:
-                pass
         return None
 
-async def shell_cmd(cmd):
-    proc = await asyncio.create_subprocess_shell(
-        cmd,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
-    out, errorz = await proc.communicate()
-    if errorz:
-        if "unavailable videos are hidden" in (errorz.decode("utf-8")).lower():
-            return out.decode("utf-8")
-        else:
-            return errorz.decode("utf-8")
-    return out.decode("utf-8")
+    download_token = data.get("download_token")
+    if not download_token:
+        return None
+
+    stream_url = f"{API_URL}/stream/{video_id}?type={media_type}&token={download_token}"
+
+    for attempt in range(1, DOWNLOAD_RETRIES + 1):
+        try:
+            if not await _stream_to_part(session, stream_url, part_path, timeout):
+                return None
+            break
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            LOGGER(__name__).warning(
+                f"Download of {video_id} interrupted ({attempt}/{DOWNLOAD_RETRIES}), resuming: {e}"
+            )
+        except Exception:
+            return None
+    else:
+        return None
+
+    if not os.path.exists(part_path) or os.path.getsize(part_path) == 0:
+        return None
+    os.replace(part_path, file_path)
+    media_cache.touch(file_path)
+    await media_cache.trim()
+    return file_path
 
 class YouTubeAPI:
     def __init__(self):
@@ -175,6 +168,111 @@ class YouTubeAPI:
         self.status = "https://www.youtube.com/oembed?url="
         self.listbase = "https://youtube.com/playlist?list="
         self.reg = re.compile(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])")
+        self.idreg = re.compile(r"(?:v=|youtu\.be/|shorts/|live/)([0-9A-Za-z_-]{11})")
+        self.meta = TTLCache(config.YT_META_CACHE_SIZE, config.YT_META_CACHE_TTL)
+        self.meta_flight = SingleFlight()
+        # .part path -> download still running behind a progressive playback.
+        self.growing = {}
+
+    def _meta_key(self, link: str, limit: int):
+        match = self.idreg.search(link)
+        if match and limit == 1:
+            return ("id", match.group(1))
+        return ("query", " ".join(link.lower().split()), limit)
+
+    async def _lookup(self, link: str, limit: int) -> list:
+        results = (await VideosSearch(link, limit=limit).next())["result"]
+        if results:
+            self.meta.set(self._meta_key(link, limit), results)
+            for result in results:
+                self.meta.set(("id", result["id"]), [result])
+        return results
+
+    async def search(self, link: str, limit: int = 1) -> list:
+        """Cached VideosSearch results, keyed by video id or normalized query."""
+        key = self._meta_key(link, limit)
+        results = self.meta.get(key)
+        if results is None:
+            results = await self.meta_flight.do(key, self._lookup, link, limit)
+        return results
+
+    def cached(self, videoid: str, video: Union[bool, str] = None) -> Union[str, None]:
+        file_path = os.path.join(DOWNLOAD_DIR, f"{videoid}.{'mp4' if video else 'mp3'}")
+        return file_path if os.path.exists(file_path) else None
+
+    def final(self, file_path: str) -> str:
+        """Path a (possibly still growing) download will have once complete."""
+        if file_path and file_path.endswith(".part"):
+            return file_path[: -len(".part")]
+        return file_path
+
+    def _forget_growing(self, part_path: str, task: asyncio.Task):
+        if self.growing.get(part_path) is task:
+            self.growing.pop(part_path, None)
+
+    async def progressive(
+        self,
+        link: str,
+        seconds: int = 0,
+        video: Union[bool, str] = None,
+        videoid: Union[bool, str] = None,
+    ) -> Tuple[Union[str, None], bool]:
+        """Like `download`, but hand back the .part file once playback can start.
+
+        Audio tracks of at least PROGRESSIVE_MIN_DURATION return as soon as
+        PROGRESSIVE_BUFFER KB are on disk, the rest downloads in the
+        background. Videos always wait, a partial MP4 usually has its moov
+        atom still missing at the end. The flag is True while the returned path is still growing.
+        If the transfer stalls before the buffer fills, this waits for the
+        whole file exactly like `download`.
+        """
+        if videoid:
+            link = self.base + link
+        wanted = not video and seconds >= config.PROGRESSIVE_MIN_DURATION
+        if not config.PROGRESSIVE_PLAYBACK or not wanted:
+            file_path, direct = await self.download(link, None, video=video)
+            return file_path, False
+        video_id = link.split('v=')[-1].split('&')[0] if 'v=' in link else link
+        if self.cached(video_id, video):
+            file_path, direct = await self.download(link, None, video=video)
+            return file_path, False
+
+        task = asyncio.ensure_future(download_video(link) if video else download_song(link))
+        part_path = os.path.join(DOWNLOAD_DIR, f"{video_id}.{'mp4' if video else 'mp3'}.part")
+        self.growing[part_path] = task
+        task.add_done_callback(lambda done: self._forget_growing(part_path, done))
+
+        size, idle = 0, 0.0
+        while not task.done():
+            await asyncio.sleep(PROGRESSIVE_POLL)
+            try:
+                current = os.path.getsize(part_path)
+            except OSError:
+                current = 0
+            if current >= config.PROGRESSIVE_BUFFER * 1024:
+                return part_path, True
+            idle = 0 if current > size else idle + PROGRESSIVE_POLL
+            size = current
+            if idle >= config.PROGRESSIVE_STALL:
+                LOGGER(__name__).warning(
+                    f"Download of {video_id} stalled before playback could start, waiting for the full file."
+                )
+                break
+        return await self.complete(part_path), False
+
+    async def complete(self, file_path: str) -> Union[str, None]:
+        """Wait for a path handed out by `progressive` to finish downloading."""
+        task = self.growing.get(file_path)
+        if task is None:
+            final = self.final(file_path)
+            return final if final and os.path.exists(final) else None
+        try:
+            # Shielded so a caller giving up leaves the download running.
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            return None
 
     async def exists(self, link: str, videoid: Union[bool, str] = None):
         if videoid:
@@ -202,8 +300,7 @@ class YouTubeAPI:
             link = self.base + link
         if "&" in link:
             link = link.split("&")[0]
-        results = VideosSearch(link, limit=1)
-        for result in (await results.next())["result"]:
+        for result in await self.search(link):
             title = result["title"]
             duration_min = result["duration"]
             thumbnail = result["thumbnails"][0]["url"].split("?")[0]
@@ -216,8 +313,7 @@ class YouTubeAPI:
             link = self.base + link
         if "&" in link:
             link = link.split("&")[0]
-        results = VideosSearch(link, limit=1)
-        for result in (await results.next())["result"]:
+        for result in await self.search(link):
             return result["title"]
 
     async def duration(self, link: str, videoid: Union[bool, str] = None):
@@ -225,8 +321,7 @@ class YouTubeAPI:
             link = self.base + link
         if "&" in link:
             link = link.split("&")[0]
-        results = VideosSearch(link, limit=1)
-        for result in (await results.next())["result"]:
+        for result in await self.search(link):
             return result["duration"]
 
     async def thumbnail(self, link: str, videoid: Union[bool, str] = None):
@@ -234,8 +329,7 @@ class YouTubeAPI:
             link = self.base + link
         if "&" in link:
             link = link.split("&")[0]
-        results = VideosSearch(link, limit=1)
-        for result in (await results.next())["result"]:
+        for result in await self.search(link):
             return result["thumbnails"][0]["url"].split("?")[0]
 
     async def video(self, link: str, videoid: Union[bool, str] = None):
@@ -257,11 +351,8 @@ class YouTubeAPI:
             link = self.listbase + link
         if "&" in link:
             link = link.split("&")[0]
-        playlist = await shell_cmd(
-            f"yt-dlp -i --get-id --flat-playlist --playlist-end {limit} --skip-download {link}"
-        )
         try:
-            result = [key for key in playlist.split("\n") if key]
+            result = [video_id async for video_id in playlists.iter_ids(link, limit)]
         except:
             result = []
         return result
@@ -271,8 +362,7 @@ class YouTubeAPI:
             link = self.base + link
         if "&" in link:
             link = link.split("&")[0]
-        results = VideosSearch(link, limit=1)
-        for result in (await results.next())["result"]:
+        for result in await self.search(link):
             title = result["title"]
             duration_min = result["duration"]
             vidid = result["id"]
@@ -293,25 +383,23 @@ class YouTubeAPI:
         if "&" in link:
             link = link.split("&")[0]
         ytdl_opts = {"quiet": True}
-        ydl = yt_dlp.YoutubeDL(ytdl_opts)
-        with ydl:
-            formats_available = []
-            r = ydl.extract_info(link, download=False)
-            for format in r["formats"]:
-                try:
-                    if "dash" not in str(format["format"]).lower():
-                        formats_available.append(
-                            {
-                                "format": format["format"],
-                                "filesize": format.get("filesize"),
-                                "format_id": format["format_id"],
-                                "ext": format["ext"],
-                                "format_note": format["format_note"],
-                                "yturl": link,
-                            }
-                        )
-                except:
-                    continue
+        formats_available = []
+        r = await ytdlp.extract(link, ytdl_opts)
+        for format in r["formats"]:
+            try:
+                if "dash" not in str(format["format"]).lower():
+                    formats_available.append(
+                        {
+                            "format": format["format"],
+                            "filesize": format.get("filesize"),
+                            "format_id": format["format_id"],
+                            "ext": format["ext"],
+                            "format_note": format["format_note"],
+                            "yturl": link,
+                        }
+                    )
+            except:
+                continue
         return formats_available, link
 
     async def slider(self, link: str, query_type: int, videoid: Union[bool, str] = None):
@@ -319,8 +407,7 @@ class YouTubeAPI:
             link = self.base + link
         if "&" in link:
             link = link.split("&")[0]
-        a = VideosSearch(link, limit=10)
-        result = (await a.next()).get("result")
+        result = await self.search(link, limit=10)
         title = result[query_type]["title"]
         duration_min = result[query_type]["duration"]
         vidid = result[query_type]["id"]
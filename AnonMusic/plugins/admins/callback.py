@@ -21,7 +21,10 @@ from AnonMusic.utils.database import (
 from AnonMusic.utils.decorators.language import languageCB
 from AnonMusic.utils.formatters import seconds_to_min
 from AnonMusic.utils.inline import close_markup, stream_markup, stream_markup_timer
-from AnonMusic.utils.thumbnails import get_thumb
+from AnonMusic.utils.stream.autoclear import auto_clean
+from AnonMusic.utils.stream.prefetch import prefetcher
+from AnonMusic.utils.fileids import send_photo
+from AnonMusic.utils.thumbnails import now_playing_thumb, upgrade_thumb
 from config import (
     BANNED_USERS,
     SOUNCLOUD_IMG_URL,
@@ -32,7 +35,6 @@ from config import (
     adminlist,
     confirmer,
     votemode,
-    autoclean,
 )
 from strings import get_string
 
@@ -250,8 +252,7 @@ async def del_back_playlist(client, CallbackQuery:CallbackQuery, _):
             try:
                 popped = check.pop(0)
                 if popped:
-                    rem = popped["file"]
-                    autoclean.remove(rem)
+                    await auto_clean(popped)
                 if not check:
                     # 5 सेकंड बाद डिलीट करने के लिए, परमिशन हैंडलिंग के साथ:
                     msg_edited = await CallbackQuery.edit_message_text(
@@ -307,6 +308,7 @@ async def del_back_playlist(client, CallbackQuery:CallbackQuery, _):
         else:
             txt = f"🔁 sᴛʀᴇᴀᴍ ʀᴇ-ᴘʟᴀʏᴇᴅ └ʙʏ : {mention}"
         await CallbackQuery.answer()
+        prefetcher.refresh(chat_id)
         queued = check[0]["file"]
         title = (check[0]["title"]).title()
         user = check[0]["by"]
@@ -352,8 +354,9 @@ async def del_back_playlist(client, CallbackQuery:CallbackQuery, _):
                     pass
                 return
             button = stream_markup(_, chat_id)
-            img = await get_thumb(videoid)
-            run = await CallbackQuery.message.reply_photo(
+            img, pending = await now_playing_thumb(videoid)
+            run = await send_photo(
+                CallbackQuery.message.reply_photo,
                 photo=img,
                 caption=_["stream_1"].format(
                     f"https://t.me/{app.username}?start=info_{videoid}",
@@ -364,6 +367,7 @@ async def del_back_playlist(client, CallbackQuery:CallbackQuery, _):
                 reply_markup=InlineKeyboardMarkup(button),
             )
             db[chat_id][0]["mystic"] = run
+            upgrade_thumb(run, pending)
             db[chat_id][0]["markup"] = "tg"
             # 5 सेकंड बाद डिलीट करने के लिए, परमिशन हैंडलिंग के साथ:
             msg = await CallbackQuery.edit_message_text(txt, reply_markup=close_markup(_))
@@ -408,8 +412,9 @@ async def del_back_playlist(client, CallbackQuery:CallbackQuery, _):
                     pass
                 return
             button = stream_markup(_, chat_id)
-            img = await get_thumb(videoid)
-            run = await CallbackQuery.message.reply_photo(
+            img, pending = await now_playing_thumb(videoid)
+            run = await send_photo(
+                CallbackQuery.message.reply_photo,
                 photo=img,
                 caption=_["stream_1"].format(
                     f"https://t.me/{app.username}?start=info_{videoid}",
@@ -420,6 +425,7 @@ async def del_back_playlist(client, CallbackQuery:CallbackQuery, _):
                 reply_markup=InlineKeyboardMarkup(button),
             )
             db[chat_id][0]["mystic"] = run
+            upgrade_thumb(run, pending)
             db[chat_id][0]["markup"] = "stream"
             # 5 सेकंड बाद डिलीट करने के लिए, परमिशन हैंडलिंग के साथ:
             msg = await CallbackQuery.edit_message_text(txt, reply_markup=close_markup(_))
@@ -446,7 +452,8 @@ async def del_back_playlist(client, CallbackQuery:CallbackQuery, _):
                     pass
                 return
             button = stream_markup(_, chat_id)
-            run = await CallbackQuery.message.reply_photo(
+            run = await send_photo(
+                CallbackQuery.message.reply_photo,
                 photo=STREAM_IMG_URL,
                 caption=_["stream_2"].format(user),
                 reply_markup=InlineKeyboardMarkup(button),
@@ -483,7 +490,8 @@ async def del_back_playlist(client, CallbackQuery:CallbackQuery, _):
                 return
             if videoid == "telegram":
                 button = stream_markup(_, chat_id)
-                run = await CallbackQuery.message.reply_photo(
+                run = await send_photo(
+                    CallbackQuery.message.reply_photo,
                     photo=TELEGRAM_AUDIO_URL
                     if str(streamtype) == "audio"
                     else TELEGRAM_VIDEO_URL,
@@ -496,7 +504,8 @@ async def del_back_playlist(client, CallbackQuery:CallbackQuery, _):
                 db[chat_id][0]["markup"] = "tg"
             elif videoid == "soundcloud":
                 button = stream_markup(_, chat_id)
-                run = await CallbackQuery.message.reply_photo(
+                run = await send_photo(
+                    CallbackQuery.message.reply_photo,
                     photo=SOUNCLOUD_IMG_URL
                     if str(streamtype) == "audio"
                     else TELEGRAM_VIDEO_URL,
@@ -509,8 +518,9 @@ async def del_back_playlist(client, CallbackQuery:CallbackQuery, _):
                 db[chat_id][0]["markup"] = "tg"
             else:
                 button = stream_markup(_, chat_id)
-                img = await get_thumb(videoid)
-                run = await CallbackQuery.message.reply_photo(
+                img, pending = await now_playing_thumb(videoid)
+                run = await send_photo(
+                    CallbackQuery.message.reply_photo,
                     photo=img,
                     caption=_["stream_1"].format(
                         f"https://t.me/{app.username}?start=info_{videoid}",
@@ -521,6 +531,7 @@ async def del_back_playlist(client, CallbackQuery:CallbackQuery, _):
                     reply_markup=InlineKeyboardMarkup(button),
                 )
                 db[chat_id][0]["mystic"] = run
+                upgrade_thumb(run, pending)
                 db[chat_id][0]["markup"] = "stream"
             # 5 सेकंड बाद डिलीट करने के लिए, परमिशन हैंडलिंग के साथ:
             msg = await CallbackQuery.edit_message_text(txt, reply_markup=close_markup(_))
@@ -7,6 +7,7 @@ from AnonMusic import app
 from AnonMusic.misc import db
 from AnonMusic.utils.decorators import AdminRightsCheck
 from AnonMusic.utils.inline import close_markup
+from AnonMusic.utils.stream.prefetch import prefetcher
 from config import BANNED_USERS
 
 
@@ -28,6 +29,7 @@ async def admins(Client, message: Message, _, chat_id):
         return await message.reply_text(_["admin_15"], reply_markup=close_markup(_))
     random.shuffle(check)
     check.insert(0, popped)
+    prefetcher.refresh(chat_id)
     await message.reply_text(
         _["admin_16"].format(message.from_user.mention), reply_markup=close_markup(_)
     )
@@ -8,8 +8,11 @@ from AnonMusic.misc import db
 from AnonMusic.utils.database import get_loop
 from AnonMusic.utils.decorators import AdminRightsCheck
 from AnonMusic.utils.inline import close_markup, stream_markup
-from AnonMusic.utils.thumbnails import get_thumb
-from config import BANNED_USERS,autoclean
+from AnonMusic.utils.fileids import send_photo
+from AnonMusic.utils.thumbnails import now_playing_thumb, upgrade_thumb
+from AnonMusic.utils.stream.autoclear import auto_clean
+from AnonMusic.utils.stream.prefetch import prefetcher
+from config import BANNED_USERS
 
 
 @app.on_message(
@@ -37,8 +40,7 @@ async def skip(cli, message: Message, _, chat_id):
                             except:
                                 return await message.reply_text(_["admin_12"])
                             if popped:
-                                rem = popped["file"]
-                                autoclean.remove(rem)
+                                await auto_clean(popped)
                             if not check:
                                 try:
                                     await message.reply_text(
@@ -66,8 +68,7 @@ async def skip(cli, message: Message, _, chat_id):
         try:
             popped = check.pop(0)
             if popped:
-                rem = popped["file"]
-                autoclean.remove(rem)
+                await auto_clean(popped)
             if not check:
                 await message.reply_text(
                     text=_["admin_6"].format(
@@ -90,6 +91,7 @@ async def skip(cli, message: Message, _, chat_id):
                 return await Anony.stop_stream(chat_id)
             except:
                 return
+    prefetcher.refresh(chat_id)
     queued = check[0]["file"]
     title = (check[0]["title"]).title()
     user = check[0]["by"]
@@ -117,8 +119,9 @@ async def skip(cli, message: Message, _, chat_id):
         except:
             return await message.reply_text(_["call_6"])
         button = stream_markup(_, chat_id)
-        img = await get_thumb(videoid)
-        run = await message.reply_photo(
+        img, pending = await now_playing_thumb(videoid)
+        run = await send_photo(
+            message.reply_photo,
             photo=img,
             caption=_["stream_1"].format(
                 f"https://t.me/{app.username}?start=info_{videoid}",
@@ -129,6 +132,7 @@ async def skip(cli, message: Message, _, chat_id):
             reply_markup=InlineKeyboardMarkup(button),
         )
         db[chat_id][0]["mystic"] = run
+        upgrade_thumb(run, pending)
         db[chat_id][0]["markup"] = "tg"
     elif "vid_" in queued:
         mystic = await message.reply_text(_["call_7"], disable_web_page_preview=True)
@@ -150,8 +154,9 @@ async def skip(cli, message: Message, _, chat_id):
         except:
             return await mystic.edit_text(_["call_6"])
         button = stream_markup(_, chat_id)
-        img = await get_thumb(videoid)
-        run = await message.reply_photo(
+        img, pending = await now_playing_thumb(videoid)
+        run = await send_photo(
+            message.reply_photo,
             photo=img,
             caption=_["stream_1"].format(
                 f"https://t.me/{app.username}?start=info_{videoid}",
@@ -162,6 +167,7 @@ async def skip(cli, message: Message, _, chat_id):
             reply_markup=InlineKeyboardMarkup(button),
         )
         db[chat_id][0]["mystic"] = run
+        upgrade_thumb(run, pending)
         db[chat_id][0]["markup"] = "stream"
         await mystic.delete()
     elif "index_" in queued:
@@ -170,7 +176,8 @@ async def skip(cli, message: Message, _, chat_id):
         except:
             return await message.reply_text(_["call_6"])
         button = stream_markup(_, chat_id)
-        run = await message.reply_photo(
+        run = await send_photo(
+            message.reply_photo,
             photo=config.STREAM_IMG_URL,
             caption=_["stream_2"].format(user),
             reply_markup=InlineKeyboardMarkup(button),
@@ -193,7 +200,8 @@ async def skip(cli, message: Message, _, chat_id):
             return await message.reply_text(_["call_6"])
         if videoid == "telegram":
             button = stream_markup(_, chat_id)
-            run = await message.reply_photo(
+            run = await send_photo(
+                message.reply_photo,
                 photo=config.TELEGRAM_AUDIO_URL
                 if str(streamtype) == "audio"
                 else config.TELEGRAM_VIDEO_URL,
@@ -206,7 +214,8 @@ async def skip(cli, message: Message, _, chat_id):
             db[chat_id][0]["markup"] = "tg"
         elif videoid == "soundcloud":
             button = stream_markup(_, chat_id)
-            run = await message.reply_photo(
+            run = await send_photo(
+                message.reply_photo,
                 photo=config.SOUNCLOUD_IMG_URL
                 if str(streamtype) == "audio"
                 else config.TELEGRAM_VIDEO_URL,
@@ -219,8 +228,9 @@ async def skip(cli, message: Message, _, chat_id):
             db[chat_id][0]["markup"] = "tg"
         else:
             button = stream_markup(_, chat_id)
-            img = await get_thumb(videoid)
-            run = await message.reply_photo(
+            img, pending = await now_playing_thumb(videoid)
+            run = await send_photo(
+                message.reply_photo,
                 photo=img,
                 caption=_["stream_1"].format(
                     f"https://t.me/{app.username}?start=info_{videoid}",
@@ -231,4 +241,5 @@ async def skip(cli, message: Message, _, chat_id):
                 reply_markup=InlineKeyboardMarkup(button),
             )
             db[chat_id][0]["mystic"] = run
+            upgrade_thumb(run, pending)
             db[chat_id][0]["markup"] = "stream"
@@ -16,9 +16,9 @@ from AnonMusic.plugins.sudo.sudoers import sudoers_list
 from AnonMusic.utils.database import (
     add_served_chat,
     add_served_user,
-    blacklisted_chats,
     get_lang,
     is_banned_user,
+    is_blacklisted_chat,
     is_on_off,
     blacklist_chat,
 )
@@ -166,9 +166,6 @@ async def start_gp(client, message: Message, _):
 async def welcome(client, message: Message):
     for member in message.new_chat_members:
         try:
-            language = await get_lang(message.chat.id)
-            _ = get_string(language)
-            
             if await is_banned_user(member.id):
                 try:
                     await message.chat.ban_member(member.id)
@@ -179,12 +176,15 @@ async def welcome(client, message: Message):
                     print(f"Error banning user {member.id} in chat {message.chat.id}: {e}")
             
             if member.id == app.id:
+                # Only needed when the bot itself joins, not per member.
+                language = await get_lang(message.chat.id)
+                _ = get_string(language)
                 if message.chat.type != ChatType.SUPERGROUP:
                     await message.reply_text(_["start_4"])
                     print(f"Leaving chat {message.chat.id} because it's not a supergroup.")
                     return await app.leave_chat(message.chat.id)
                 
-                if message.chat.id in await blacklisted_chats():
+                if await is_blacklisted_chat(message.chat.id):
                     await message.reply_text(
                         _["start_5"].format(
                             app.mention,
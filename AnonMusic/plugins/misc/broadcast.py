@@ -11,9 +11,11 @@ from AnonMusic import app
 from AnonMusic.misc import SUDOERS
 from AnonMusic.utils.database import (
     get_active_chats,
+    count_served_chats,
+    count_served_users,
     get_authuser_names,
-    get_served_chats,
-    get_served_users,
+    iter_served_chats,
+    iter_served_users,
 )
 from AnonMusic.utils.formatters import alpha_to_int
 from config import adminlist
@@ -71,27 +73,22 @@ async def broadcast_command(client, message: Message):
     mode = "forward" if "-forward" in command else "copy"
 
     # Determine recipients
+    if "-all" in command:
+        to_users, to_chats = True, True
+    elif "-users" in command:
+        to_users, to_chats = True, False
+    elif "-chats" in command:
+        to_users, to_chats = False, True
+    else:
+        return await message.reply("⚙️ ᴜsᴀɢᴇ :\n/broadcast -all/-users/-chats [-forward]")
     try:
-        if "-all" in command:
-            users = await get_served_users()
-            chats = await get_served_chats()
-            target_users = [u["user_id"] for u in users]
-            target_chats = [c["chat_id"] for c in chats]
-        elif "-users" in command:
-            users = await get_served_users()
-            target_users = [u["user_id"] for u in users]
-            target_chats = []
-        elif "-chats" in command:
-            chats = await get_served_chats()
-            target_chats = [c["chat_id"] for c in chats]
-            target_users = []
-        else:
-            return await message.reply("⚙️ ᴜsᴀɢᴇ :\n/broadcast -all/-users/-chats [-forward]")
+        total_users = await count_served_users(cached=False) if to_users else 0
+        total_chats = await count_served_chats(cached=False) if to_chats else 0
     except Exception as e:
         print(f"Error getting targets: {e}")
         return await message.reply("🚫 ᴇʀʀᴏʀ ғᴇᴛᴄʜɪɴɢ ʀᴇᴄɪᴘɪᴇɴᴛ ʟɪsᴛ.")
 
-    if not target_users and not target_chats:
+    if not total_users and not total_chats:
         return await message.reply("🚫 ɴᴏ ʀᴇᴄɪᴘɪᴇɴᴛs ғᴏᴜɴᴅ.")
 
     # Get content
@@ -107,21 +104,29 @@ async def broadcast_command(client, message: Message):
         content = text
 
     # Initialize broadcast
-    targets = target_users + target_chats
     broadcast_status.reset()
     broadcast_status.update_status(
         active=True,
-        total=len(targets),
+        total=total_users + total_chats,
         start_time=time.time(),
-        users=len(target_users),
-        chats=len(target_chats),
+        users=total_users,
+        chats=total_chats,
         mode=mode,
         current_batch=0,
     )
 
     status_msg = await message.reply("📡 ʙʀᴏᴀᴅᴄᴀsᴛ ɪɴɪᴛɪᴀʟɪᴢᴀᴛɪᴏɴ ᴄᴏᴍᴘʟᴇᴛᴇ. sᴛᴀʀᴛɪɴɢ...")
 
-    async def deliver(chat_id: Union[int, str]):
+    async def targets():
+        # Streamed page by page so memory stays flat however many recipients.
+        if to_users:
+            async for user_id in iter_served_users():
+                yield user_id, True
+        if to_chats:
+            async for chat_id in iter_served_chats():
+                yield chat_id, False
+
+    async def deliver(chat_id: Union[int, str], is_user: bool):
         try:
             if isinstance(content, str):
                 await app.send_message(chat_id, content)
@@ -131,7 +136,7 @@ async def broadcast_command(client, message: Message):
                 await content.copy(chat_id)
 
             broadcast_status.sent += 1
-            if chat_id in target_users:
+            if is_user:
                 broadcast_status.sent_users += 1
             else:
                 broadcast_status.sent_chats += 1
@@ -139,7 +144,7 @@ async def broadcast_command(client, message: Message):
         except FloodWait as e:
             wait_time = min(e.value, 60)
             await asyncio.sleep(wait_time)
-            return await deliver(chat_id)
+            return await deliver(chat_id, is_user)
         except RPCError as e:
             broadcast_status.failed += 1
             broadcast_status.failed_targets.append((chat_id, str(e)))
@@ -152,17 +157,26 @@ async def broadcast_command(client, message: Message):
             return False
 
     BATCH_SIZE = 100
-    total_batches = (len(targets) + BATCH_SIZE - 1) // BATCH_SIZE
-
-    for batch_num in range(total_batches):
+    total_batches = (broadcast_status.total + BATCH_SIZE - 1) // BATCH_SIZE
+
+    async def batches():
+        batch = []
+        async for target in targets():
+            batch.append(target)
+            if len(batch) == BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async for batch in batches():
         if not broadcast_status.active:
             break
+        if broadcast_status.current_batch:
+            await asyncio.sleep(1.5)
+        broadcast_status.current_batch += 1
 
-        batch_start = batch_num * BATCH_SIZE
-        batch = targets[batch_start:batch_start + BATCH_SIZE]
-        broadcast_status.current_batch = batch_num + 1
-
-        tasks = [deliver(chat_id) for chat_id in batch]
+        tasks = [deliver(chat_id, is_user) for chat_id, is_user in batch]
         results = await asyncio.gather(*tasks, return_exceptions=True)
 
         progress = broadcast_status.get_progress()
@@ -172,7 +186,7 @@ async def broadcast_command(client, message: Message):
         await status_msg.edit_text(
             f"📣 <b>ʙʀᴏᴀᴅᴄᴀsᴛ ᴘʀᴏɢʀᴇss :</b>\n\n"
             f"{progress_bar} <code>{progress['percent']}%</code>\n"
-            f"📦 ʙᴀᴛᴄʜ : <code>{broadcast_status.current_batch}/{total_batches}</code>\n"
+            f"📦 ʙᴀᴛᴄʜ : <code>{broadcast_status.current_batch}/{max(total_batches, broadcast_status.current_batch)}</code>\n"
             f"✅ sᴇɴᴛ : <code>{broadcast_status.sent}</code>\n"
             f"🚫 ғᴀɪʟᴇᴅ : <code>{broadcast_status.failed}</code>\n"
             f"⏱ ᴇᴛᴀ : <code>{eta_fmt}</code>\n"
@@ -180,9 +194,6 @@ async def broadcast_command(client, message: Message):
             f"<b>⚙️ ɪғ ʏᴏᴜ ᴡᴀɴᴛ ᴄᴀɴᴄᴇʟ ʙʀᴏᴀᴅᴄᴀsᴛ : /cancel_gcast</b>"
         )
 
-        if batch_num < total_batches - 1:
-            await asyncio.sleep(1.5)
-
     broadcast_status.active = False
     elapsed = time.time() - broadcast_status.start_time
 
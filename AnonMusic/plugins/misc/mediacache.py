@@ -0,0 +1,22 @@
+import asyncio
+import logging
+
+import config
+from AnonMusic.utils.stream.autoclear import media_cache
+
+logger = logging.getLogger(__name__)
+
+
+async def media_cache_cleaner():
+    """Periodically trim downloads/ back under the MEDIA_CACHE_SIZE budget."""
+    while True:
+        await asyncio.sleep(config.CACHE_SLEEP)
+        try:
+            freed = await media_cache.trim()
+            if freed:
+                logger.info(f"Media cache evicted {freed} bytes")
+        except Exception as e:
+            logger.warning(f"Media cache cleanup failed: {e}")
+
+
+asyncio.create_task(media_cache_cleaner())
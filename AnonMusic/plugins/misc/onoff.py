@@ -0,0 +1,21 @@
+import asyncio
+import logging
+
+import config
+from AnonMusic.utils.database import load_on_off
+
+logger = logging.getLogger(__name__)
+
+
+async def on_off_reloader():
+    """Pick up maintenance/logger flags toggled by another instance."""
+    while True:
+        await asyncio.sleep(config.ONOFF_RELOAD)
+        try:
+            await load_on_off()
+        except Exception as e:
+            logger.warning(f"Reloading on/off flags failed: {e}")
+
+
+if config.ONOFF_RELOAD > 0:
+    asyncio.create_task(on_off_reloader())
@@ -0,0 +1,19 @@
+import asyncio
+
+import config
+from AnonMusic.logging import LOGGER
+from AnonMusic.utils.stream.snapshot import queue_snapshots
+
+
+async def queue_snapshotter():
+    """Write changed play queues so a restart or crash can resume them."""
+    while True:
+        await asyncio.sleep(config.QUEUE_SNAPSHOT_INTERVAL)
+        try:
+            await queue_snapshots.save()
+        except Exception as e:
+            LOGGER(__name__).warning(f"Saving play queues failed: {e}")
+
+
+if config.QUEUE_SNAPSHOT_INTERVAL > 0:
+    asyncio.create_task(queue_snapshotter())
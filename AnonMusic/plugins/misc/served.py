@@ -0,0 +1,14 @@
+import asyncio
+
+import config
+from AnonMusic.utils.database import flush_served
+
+
+async def served_flusher():
+    """Write buffered served users/chats to the database in batches."""
+    while True:
+        await asyncio.sleep(config.SERVED_FLUSH_INTERVAL)
+        await flush_served()
+
+
+asyncio.create_task(served_flusher())
@@ -0,0 +1,42 @@
+from pyrogram import filters
+from pyrogram.types import Message
+
+from AnonMusic import app
+from AnonMusic.core.dbmetrics import db_metrics
+from AnonMusic.misc import SUDOERS
+
+
+def _rows(rows: list, hits: bool) -> str:
+    if not rows:
+        return "└ <code>no calls yet</code>\n"
+    text = ""
+    for name, stats in rows:
+        text += (
+            f"├ <code>{name}</code> : p95 <code>{stats['p95']}ms</code>, "
+            f"avg <code>{stats['avg']}ms</code>, max <code>{stats['max']}ms</code>, "
+            f"<code>{stats['calls']}</code> calls"
+        )
+        if hits:
+            text += f", <code>{stats['hit_ratio']}%</code> cached"
+        if stats["errors"]:
+            text += f", <code>{stats['errors']}</code> failed"
+        text += "\n"
+    return text
+
+
+@app.on_message(filters.command(["dbperf"]) & SUDOERS)
+async def db_perf(_, message: Message):
+    arg = message.command[1].lower() if len(message.command) > 1 else ""
+    if arg == "reset":
+        db_metrics.reset()
+        return await message.reply_text("🗃️ Database latency counters reset.")
+    limit = int(arg) if arg.isdigit() else 10
+    key = "total" if arg == "total" else "p95"
+    text = (
+        f"<b>🗃️ Slowest Database Functions (by {key})</b>\n"
+        + _rows(db_metrics.slowest(db_metrics.functions, limit, key), True)
+        + f"\n<b>💾 Slowest Storage Calls (by {key})</b>\n"
+        + _rows(db_metrics.slowest(db_metrics.storage, limit, key), False)
+        + "\n<i>/dbperf [count|total|reset] — total ranks by time spent overall.</i>"
+    )
+    await message.reply_text(text)
@@ -9,10 +9,11 @@ from AnonMusic.misc import SUDOERS
 from AnonMusic.utils import get_readable_time
 from AnonMusic.utils.database import (
     add_banned_user,
+    count_served_chats,
     get_banned_count,
     get_banned_users,
-    get_served_chats,
     is_banned_user,
+    iter_served_chats,
     remove_banned_user,
 )
 from AnonMusic.utils.decorators.language import language
@@ -38,14 +39,10 @@ async def global_ban(client, message: Message, _):
         return await message.reply_text(_["gban_4"].format(user.mention))
     if user.id not in BANNED_USERS:
         BANNED_USERS.add(user.id)
-    served_chats = []
-    chats = await get_served_chats()
-    for chat in chats:
-        served_chats.append(int(chat["chat_id"]))
-    time_expected = get_readable_time(len(served_chats))
+    time_expected = get_readable_time(await count_served_chats())
     mystic = await message.reply_text(_["gban_5"].format(user.mention, time_expected))
     number_of_chats = 0
-    for chat_id in served_chats:
+    async for chat_id in iter_served_chats():
         try:
             await app.ban_chat_member(chat_id, user.id)
             number_of_chats += 1
@@ -80,14 +77,10 @@ async def global_un(client, message: Message, _):
         return await message.reply_text(_["gban_7"].format(user.mention))
     if user.id in BANNED_USERS:
         BANNED_USERS.remove(user.id)
-    served_chats = []
-    chats = await get_served_chats()
-    for chat in chats:
-        served_chats.append(int(chat["chat_id"]))
-    time_expected = get_readable_time(len(served_chats))
+    time_expected = get_readable_time(await count_served_chats())
     mystic = await message.reply_text(_["gban_8"].format(user.mention, time_expected))
     number_of_chats = 0
-    for chat_id in served_chats:
+    async for chat_id in iter_served_chats():
         try:
             await app.unban_chat_member(chat_id, user.id)
             number_of_chats += 1
@@ -0,0 +1,31 @@
+from pyrogram import filters
+from pyrogram.types import Message
+
+from AnonMusic import app
+from AnonMusic.core.indexes import indexes
+from AnonMusic.misc import SUDOERS
+
+
+def _listing(title: str, items: list) -> str:
+    if not items:
+        return f"<b>{title}</b> : <code>none</code>\n"
+    return f"<b>{title}</b>\n" + "".join(f"├ <code>{item}</code>\n" for item in items)
+
+
+@app.on_message(filters.command(["indexes", "dbindexes"]) & SUDOERS)
+async def index_report(_, message: Message):
+    mystic = await message.reply_text("🗃️ Checking database indexes...")
+    report = await indexes.report()
+    text = (
+        _listing("❌ Missing", report["missing"])
+        + _listing("💤 Unused Since Server Start", report["unused"])
+        + _listing("⚠️ Created Without Unique (duplicates)", report["degraded"])
+    )
+    if len(message.command) > 1 and message.command[1].lower() == "explain":
+        plans = await indexes.explain()
+        text += "\n<b>🔍 Hot Query Plans</b>\n" + "".join(
+            f"├ {query} : <code>{plan}</code>\n" for query, plan in plans.items()
+        )
+    else:
+        text += "\n<i>Use /indexes explain for the plans of the hot queries.</i>"
+    await mystic.edit_text(text)
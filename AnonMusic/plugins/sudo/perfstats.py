@@ -0,0 +1,181 @@
+from humanize import naturalsize
+from pyrogram import filters
+from pyrogram.types import Message
+
+from AnonMusic import YouTube, app
+from AnonMusic.core.dbmetrics import db_metrics
+from AnonMusic.core.http import http_client
+from AnonMusic.core.userbot import assistants
+from AnonMusic.core.ytdlp import ytdlp
+from AnonMusic.misc import SUDOERS
+from AnonMusic.platforms.Youtube import downloads_flight
+from AnonMusic.utils.database import served_chats, served_users
+from AnonMusic.utils.fileids import stats as fileid_stats
+from AnonMusic.utils.loopmonitor import loop_monitor
+from AnonMusic.utils.scheduler import assistant_scheduler
+from AnonMusic.utils.stream.autoclear import media_cache
+from AnonMusic.utils.stream.prefetch import prefetcher
+from AnonMusic.utils.stream.snapshot import queue_snapshots
+from AnonMusic.utils.thumbnails import card_stats, thumbs_flight
+
+
+def http_section() -> str:
+    stats = http_client.stats()
+    return (
+        "<b>🌐 HTTP Pool</b>\n"
+        f"├ Requests : <code>{stats['requests']}</code>\n"
+        f"├ New Connections : <code>{stats['new_connections']}</code>\n"
+        f"├ Reused Connections : <code>{stats['reused_connections']}</code> ({stats['reuse_ratio']}%)\n"
+        f"└ DNS Cache : <code>{stats['dns_hits']}</code> hits / <code>{stats['dns_misses']}</code> misses\n"
+    )
+
+
+def downloads_section() -> str:
+    stats = downloads_flight.stats()
+    return (
+        "<b>📥 Downloads</b>\n"
+        f"├ In Flight : <code>{stats['inflight']}</code>\n"
+        f"├ Started : <code>{stats['started']}</code>\n"
+        f"└ Saved (coalesced) : <code>{stats['coalesced']}</code>\n"
+    )
+
+
+def media_cache_section() -> str:
+    stats = media_cache.stats()
+    return (
+        "<b>🎵 Media Cache</b>\n"
+        f"├ Files : <code>{stats['files']}</code> (<code>{stats['pinned']}</code> pinned by queues)\n"
+        f"├ Size : <code>{naturalsize(stats['size'])}</code> / <code>{naturalsize(stats['budget'])}</code>\n"
+        f"├ Hits : <code>{stats['hits']}</code> / Misses : <code>{stats['misses']}</code> ({stats['hit_ratio']}%)\n"
+        f"└ Evicted : <code>{stats['evicted']}</code>\n"
+    )
+
+
+def metadata_section() -> str:
+    stats = YouTube.meta.stats()
+    return (
+        "<b>🔎 YouTube Metadata Cache</b>\n"
+        f"├ Entries : <code>{stats['size']}</code> / <code>{stats['maxsize']}</code>\n"
+        f"├ Hits : <code>{stats['hits']}</code> / Misses : <code>{stats['misses']}</code> ({stats['hit_ratio']}%)\n"
+        f"└ Lookups Coalesced : <code>{YouTube.meta_flight.coalesced}</code>\n"
+    )
+
+
+def prefetch_section() -> str:
+    stats = prefetcher.stats()
+    return (
+        "<b>⏭ Prefetch</b>\n"
+        f"├ Active : <code>{stats['active']}</code>\n"
+        f"├ Started : <code>{stats['started']}</code> / Completed : <code>{stats['completed']}</code>\n"
+        f"└ Cancelled : <code>{stats['cancelled']}</code>\n"
+    )
+
+
+def extraction_section() -> str:
+    stats = ytdlp.stats()
+    cache = stats["cache"]
+    return (
+        "<b>🧩 yt-dlp Pool</b>\n"
+        f"├ Workers : <code>{stats['workers']}</code> / In Flight : <code>{stats['inflight']}</code>\n"
+        f"├ Extractions : <code>{stats['calls']}</code> (<code>{stats['failures']}</code> failed, avg <code>{stats['avg_time']}s</code>)\n"
+        f"└ Cache : <code>{cache['hits']}</code> hits / <code>{cache['misses']}</code> misses ({cache['hit_ratio']}%)\n"
+    )
+
+
+def event_loop_section() -> str:
+    stats = loop_monitor.stats()
+    return (
+        "<b>⏱ Event Loop</b>\n"
+        f"├ Blocked : <code>{stats['blocked']}s</code> ({stats['blocked_ratio']}% of uptime)\n"
+        f"├ Stalls : <code>{stats['stalls']}</code>\n"
+        f"└ Worst Stall : <code>{stats['worst']}s</code>\n"
+    )
+
+
+def thumbnails_section() -> str:
+    lookups = card_stats["hits"] + card_stats["misses"]
+    ratio = round(card_stats["hits"] / lookups * 100, 2) if lookups else 0
+    return (
+        "<b>🎨 Now-Playing Cards</b>\n"
+        f"├ Hits : <code>{card_stats['hits']}</code> / Misses : <code>{card_stats['misses']}</code> ({ratio}%)\n"
+        f"├ Renders Coalesced : <code>{thumbs_flight.coalesced}</code>\n"
+        f"└ Evicted : <code>{card_stats['evicted']}</code>\n"
+    )
+
+
+def file_ids_section() -> str:
+    stats = fileid_stats
+    return (
+        "<b>🖼 Photo file_id Reuse</b>\n"
+        f"├ Reused : <code>{stats['reused']}</code>\n"
+        f"├ Uploads : <code>{stats['uploads']}</code>\n"
+        f"└ Expired : <code>{stats['expired']}</code>\n"
+    )
+
+
+def served_section() -> str:
+    users = served_users.stats()
+    chats = served_chats.stats()
+    return (
+        "<b>📝 Served Users/Chats Buffer</b>\n"
+        f"├ Backlog : <code>{users['backlog']}</code> users / <code>{chats['backlog']}</code> chats\n"
+        f"├ Flushed : <code>{users['flushed']}</code> users / <code>{chats['flushed']}</code> chats\n"
+        f"└ Failed Flushes : <code>{users['failures'] + chats['failures']}</code>\n"
+    )
+
+
+def queues_section() -> str:
+    stats = queue_snapshots.stats()
+    return (
+        "<b>💾 Queue Snapshots</b>\n"
+        f"├ Saved Queues : <code>{stats['saved']}</code> (<code>{stats['writes']}</code> writes)\n"
+        f"└ Resumed After Restart : <code>{stats['restored']}</code> / Failed : <code>{stats['failed']}</code>\n"
+    )
+
+
+def database_section() -> str:
+    slowest = db_metrics.slowest(db_metrics.functions, 3, "total")
+    lines = [
+        f"<code>{name}</code> : <code>{stats['total']}ms</code> over <code>{stats['calls']}</code> calls"
+        for name, stats in slowest
+    ] or ["<code>no calls yet</code>"]
+    return (
+        "<b>🗃️ Database Time (top 3, see /dbperf)</b>\n"
+        + "".join(f"├ {line}\n" for line in lines[:-1])
+        + f"└ {lines[-1]}\n"
+    )
+
+
+def assistants_section() -> str:
+    lines = [
+        f"Assistant {number} : <code>{stats['calls']}</code> calls, "
+        f"<code>{stats['floods']}</code> floods, <code>{stats['failures']}</code> failures"
+        + ("" if stats["healthy"] else " (unhealthy)")
+        for number, stats in assistant_scheduler.stats(assistants).items()
+    ]
+    lines.append(f"Chats Moved : <code>{assistant_scheduler.moved}</code>")
+    return (
+        "<b>🤖 Assistants</b>\n"
+        + "".join(f"├ {line}\n" for line in lines[:-1])
+        + f"└ {lines[-1]}\n"
+    )
+
+
+@app.on_message(filters.command(["perfstats", "perf"]) & SUDOERS)
+async def perf_stats(_, message: Message):
+    sections = [
+        event_loop_section(),
+        http_section(),
+        downloads_section(),
+        media_cache_section(),
+        metadata_section(),
+        prefetch_section(),
+        extraction_section(),
+        thumbnails_section(),
+        file_ids_section(),
+        served_section(),
+        queues_section(),
+        assistants_section(),
+        database_section(),
+    ]
+    await message.reply_text("\n".join(sections), disable_web_page_preview=True)
@@ -11,18 +11,32 @@ from pyrogram import filters
 
 import config
 from AnonMusic import app
+from AnonMusic.logging import LOGGER
 from AnonMusic.misc import HAPP, SUDOERS, XCB
 from AnonMusic.utils.database import (
+    flush_served,
     get_active_chats,
     remove_active_chat,
     remove_active_video_chat,
 )
 from AnonMusic.utils.decorators.language import language
 from AnonMusic.utils.pastebin import AnonyBin
+from AnonMusic.utils.stream.autoclear import media_cache
+from AnonMusic.utils.stream.snapshot import queue_snapshots
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 
+async def save_state():
+    """Write what `kill -9` would lose: play queues, buffered served ids, cache index."""
+    try:
+        await queue_snapshots.save()
+    except Exception as e:
+        LOGGER(__name__).warning(f"Saving queues before restart failed: {e}")
+    await flush_served()
+    media_cache.save()
+
+
 async def is_heroku():
     return "heroku" in socket.getfqdn()
 
@@ -106,6 +120,7 @@ async def update_(client, message, _):
             )
     else:
         os.system("pip3 install -r requirements.txt")
+        await save_state()
         os.system(f"kill -9 {os.getpid()} && bash start")
         exit()
 
@@ -133,4 +148,5 @@ async def restart_(_, message):
     await response.edit_text(
         "» ʀᴇsᴛᴀʀᴛ ᴘʀᴏᴄᴇss sᴛᴀʀᴛᴇᴅ, ᴘʟᴇᴀsᴇ ᴡᴀɪᴛ ғᴏʀ ғᴇᴡ sᴇᴄᴏɴᴅs ᴜɴᴛɪʟ ᴛʜᴇ ʙᴏᴛ sᴛᴀʀᴛs..."
     )
+    await save_state()
     os.system(f"kill -9 {os.getpid()} && bash start")
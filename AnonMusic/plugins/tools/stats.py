@@ -10,10 +10,11 @@ from pytgcalls.__version__ import __version__ as pytgver
 
 import config
 from AnonMusic import app
+from AnonMusic.core.storage import storage as database
 from AnonMusic.core.userbot import assistants
-from AnonMusic.misc import SUDOERS, mongodb
+from AnonMusic.misc import SUDOERS
 from AnonMusic.plugins import ALL_MODULES
-from AnonMusic.utils.database import get_served_chats, get_served_users, get_sudoers
+from AnonMusic.utils.database import count_served_chats, count_served_users, get_sudoers
 from AnonMusic.utils.decorators.language import language, languageCB
 from AnonMusic.utils.inline.stats import back_stats_buttons, stats_buttons
 from config import BANNED_USERS
@@ -50,8 +51,8 @@ async def overall_stats(client, CallbackQuery, _):
     except:
         pass
     await CallbackQuery.edit_message_text(_["gstats_1"].format(app.mention))
-    served_chats = len(await get_served_chats())
-    served_users = len(await get_served_users())
+    served_chats = await count_served_chats()
+    served_users = await count_served_users()
     text = _["gstats_3"].format(
         app.mention,
         len(assistants),
@@ -98,11 +99,11 @@ async def bot_stats(client, CallbackQuery, _):
     total = hdd.total / (1024.0**3)
     used = hdd.used / (1024.0**3)
     free = hdd.free / (1024.0**3)
-    call = await mongodb.command("dbstats")
+    call = await database.command("dbstats")
     datasize = call["dataSize"] / 1024
     storage = call["storageSize"] / 1024
-    served_chats = len(await get_served_chats())
-    served_users = len(await get_served_users())
+    served_chats = await count_served_chats()
+    served_users = await count_served_users()
     text = _["gstats_5"].format(
         app.mention,
         len(ALL_MODULES),
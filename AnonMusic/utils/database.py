@@ -1,43 +1,56 @@
-import random
-from typing import Dict, List, Union
+import inspect
+from dataclasses import dataclass, fields
+from typing import Dict, List, Optional, Union
 
+from pymongo import UpdateOne
+
+import config
 from AnonMusic import userbot
-from AnonMusic.core.mongo import mongodb
-
-authdb = mongodb.adminauth
-authuserdb = mongodb.authuser
-autoenddb = mongodb.autoend
-assdb = mongodb.assistants
-blacklist_chatdb = mongodb.blacklistChat
-blockeddb = mongodb.blockedusers
-chatsdb = mongodb.chats
-channeldb = mongodb.cplaymode
-countdb = mongodb.upcount
-gbansdb = mongodb.gban
-langdb = mongodb.language
-onoffdb = mongodb.onoffper
-playmodedb = mongodb.playmode
-playtypedb = mongodb.playtypedb
-skipdb = mongodb.skipmode
-sudoersdb = mongodb.sudoers
-usersdb = mongodb.tgusersdb
-afkdb = mongodb.afk
+from AnonMusic.core.dbmetrics import db_metrics
+from AnonMusic.core.storage import storage
+from AnonMusic.logging import LOGGER
+from AnonMusic.utils.scheduler import assistant_scheduler
+from AnonMusic.utils.singleflight import SingleFlight
+from AnonMusic.utils.ttlcache import TTLCache
+
+authuserdb = storage.authuser
+autoenddb = storage.autoend
+blacklist_chatdb = storage.blacklistChat
+blockeddb = storage.blockedusers
+chatsdb = storage.chats
+chatsettingsdb = storage.chatsettings
+fileiddb = storage.fileids
+gbansdb = storage.gban
+migrationsdb = storage.migrations
+onoffdb = storage.onoffper
+queuesdb = storage.queues
+sudoersdb = storage.sudoers
+usersdb = storage.tgusersdb
+afkdb = storage.afk
+
+# Per-setting collections merged into chatsettings, only read by the migration.
+authdb = storage.adminauth
+assdb = storage.assistants
+channeldb = storage.cplaymode
+countdb = storage.upcount
+langdb = storage.language
+playmodedb = storage.playmode
+playtypedb = storage.playtypedb
+skipdb = storage.skipmode
 
 # Shifting to memory [mongo sucks often]
 active = []
 activevideo = []
-assistantdict = {}
 autoend = {}
-count = {}
-channelconnect = {}
-langm = {}
+blacklisted = set()
+blockedusers_ids = set()  # /gban stores its users in blockedusers
+gban_ids = set()  # /block stores its users in gban
+chatsettings = {}
+fileidm = {}
 loop = {}
-maintenance = []
-nonadmin = {}
+onoff = set()
+onoff_loaded = False
 pause = {}
-playmode = {}
-playtype = {}
-skipmode = {}
 
 #____________________________________[ AFK DATABASE ]____________________________________
 
@@ -95,9 +108,92 @@ def get_readable_time(seconds: int) -> str:
 
 #____________________________________________________________________________________
 
+@dataclass
+class ChatSettings:
+    """Every per-chat setting, stored as one chatsettings document."""
+
+    chat_id: int
+    lang: str = "en"
+    playmode: str = "Direct"
+    playtype: str = "Everyone"
+    cmode: Optional[int] = None
+    skipmode: bool = True
+    upvotes: int = 5
+    nonadmin: bool = False
+    assistant: Optional[int] = None
+
+
+settings_flight = SingleFlight()
+SETTING_FIELDS = {field.name for field in fields(ChatSettings)} - {"chat_id"}
+
+
+async def _load_chat_settings(chat_id: int) -> ChatSettings:
+    doc = await chatsettingsdb.find_one({"chat_id": chat_id}) or {}
+    record = ChatSettings(chat_id, **{k: v for k, v in doc.items() if k in SETTING_FIELDS})
+    chatsettings[chat_id] = record
+    return record
+
+
+async def get_chat_settings(chat_id: int) -> ChatSettings:
+    record = chatsettings.get(chat_id)
+    if record is None:
+        # A cold chat costs a single read, shared by concurrent callers.
+        record = await settings_flight.do(chat_id, _load_chat_settings, chat_id)
+    return record
+
+
+async def update_chat_settings(chat_id: int, **changes):
+    """Write-through: update the cached record, then the document."""
+    record = await get_chat_settings(chat_id)
+    for key, value in changes.items():
+        setattr(record, key, value)
+    await chatsettingsdb.update_one(
+        {"chat_id": chat_id}, {"$set": changes}, upsert=True
+    )
+
+
+async def migrate_chat_settings():
+    """Fold the old per-setting collections into chatsettings, once."""
+    if await migrationsdb.find_one({"name": "chatsettings"}):
+        return
+    merged = {}
+    skipped = 0
+    # (collection, field holding the value or None for a presence flag, setting, flag value)
+    sources = (
+        (langdb, "lang", "lang", None),
+        (playmodedb, "mode", "playmode", None),
+        (playtypedb, "mode", "playtype", None),
+        (channeldb, "mode", "cmode", None),
+        (skipdb, None, "skipmode", False),
+        (countdb, "mode", "upvotes", None),
+        (authdb, None, "nonadmin", True),
+        (assdb, "assistant", "assistant", None),
+    )
+    for collection, field, setting, flag in sources:
+        async for doc in collection.find({}):
+            chat_id = doc.get("chat_id")
+            value = doc.get(field) if field else flag
+            if chat_id is None or value is None:
+                # A malformed legacy document must not keep the bot from starting.
+                skipped += 1
+                continue
+            merged.setdefault(chat_id, {})[setting] = value
+    if skipped:
+        LOGGER(__name__).warning(f"Skipped {skipped} malformed legacy setting document(s).")
+
+    requests = [
+        UpdateOne({"chat_id": chat_id}, {"$set": values}, upsert=True)
+        for chat_id, values in merged.items()
+    ]
+    for i in range(0, len(requests), 1000):
+        await chatsettingsdb.bulk_write(requests[i : i + 1000], ordered=False)
+    await chatsettingsdb.create_index("chat_id", unique=True)
+    await migrationsdb.insert_one({"name": "chatsettings"})
+    LOGGER(__name__).info(f"🗃️ Migrated settings of {len(merged)} chat(s) into chatsettings.")
+
+
 async def get_assistant_number(chat_id: int) -> str:
-    assistant = assistantdict.get(chat_id)
-    return assistant
+    return (await get_chat_settings(chat_id)).assistant
 
 
 async def get_client(assistant: int):
@@ -115,87 +211,52 @@ async def get_client(assistant: int):
 
 async def set_assistant_new(chat_id, number):
     number = int(number)
-    await assdb.update_one(
-        {"chat_id": chat_id},
-        {"$set": {"assistant": number}},
-        upsert=True,
-    )
+    await update_chat_settings(chat_id, assistant=number)
 
 
 async def set_assistant(chat_id):
     from AnonMusic.core.userbot import assistants
 
-    ran_assistant = random.choice(assistants)
-    assistantdict[chat_id] = ran_assistant
-    await assdb.update_one(
-        {"chat_id": chat_id},
-        {"$set": {"assistant": ran_assistant}},
-        upsert=True,
-    )
-    userbot = await get_client(ran_assistant)
+    assistant = assistant_scheduler.pick(assistants)
+    await update_chat_settings(chat_id, assistant=assistant)
+    userbot = await get_client(assistant)
     return userbot
 
 
-async def get_assistant(chat_id: int) -> str:
+async def get_assistant(chat_id: int, allow_move: bool = False) -> str:
+    """Client serving `chat_id`.
+
+    With `allow_move`, a chat on an unhealthy assistant is handed to another
+    one. Only the play decorator passes it, while no call is active, so a
+    live call is never left behind on the old client.
+    """
     from AnonMusic.core.userbot import assistants
 
-    assistant = assistantdict.get(chat_id)
-    if not assistant:
-        dbassistant = await assdb.find_one({"chat_id": chat_id})
-        if not dbassistant:
-            userbot = await set_assistant(chat_id)
-            return userbot
-        else:
-            got_assis = dbassistant["assistant"]
-            if got_assis in assistants:
-                assistantdict[chat_id] = got_assis
-                userbot = await get_client(got_assis)
-                return userbot
-            else:
-                userbot = await set_assistant(chat_id)
-                return userbot
-    else:
-        if assistant in assistants:
+    assistant = (await get_chat_settings(chat_id)).assistant
+    if assistant in assistants:
+        if not (allow_move and assistant_scheduler.should_move(assistant, assistants)):
             userbot = await get_client(assistant)
             return userbot
-        else:
-            userbot = await set_assistant(chat_id)
-            return userbot
+        assistant_scheduler.moved += 1
+        LOGGER(__name__).info(f"Moving {chat_id} off unhealthy assistant {assistant}.")
+    userbot = await set_assistant(chat_id)
+    return userbot
 
 
 async def set_calls_assistant(chat_id):
     from AnonMusic.core.userbot import assistants
 
-    ran_assistant = random.choice(assistants)
-    assistantdict[chat_id] = ran_assistant
-    await assdb.update_one(
-        {"chat_id": chat_id},
-        {"$set": {"assistant": ran_assistant}},
-        upsert=True,
-    )
-    return ran_assistant
+    assistant = assistant_scheduler.pick(assistants)
+    await update_chat_settings(chat_id, assistant=assistant)
+    return assistant
 
 
 async def group_assistant(self, chat_id: int) -> int:
     from AnonMusic.core.userbot import assistants
 
-    assistant = assistantdict.get(chat_id)
-    if not assistant:
-        dbassistant = await assdb.find_one({"chat_id": chat_id})
-        if not dbassistant:
-            assis = await set_calls_assistant(chat_id)
-        else:
-            assis = dbassistant["assistant"]
-            if assis in assistants:
-                assistantdict[chat_id] = assis
-                assis = assis
-            else:
-                assis = await set_calls_assistant(chat_id)
-    else:
-        if assistant in assistants:
-            assis = assistant
-        else:
-            assis = await set_calls_assistant(chat_id)
+    assis = (await get_chat_settings(chat_id)).assistant
+    if assis not in assistants:
+        assis = await set_calls_assistant(chat_id)
     if int(assis) == 1:
         return self.one
     elif int(assis) == 2:
@@ -209,47 +270,23 @@ async def group_assistant(self, chat_id: int) -> int:
 
 
 async def is_skipmode(chat_id: int) -> bool:
-    mode = skipmode.get(chat_id)
-    if not mode:
-        user = await skipdb.find_one({"chat_id": chat_id})
-        if not user:
-            skipmode[chat_id] = True
-            return True
-        skipmode[chat_id] = False
-        return False
-    return mode
+    return (await get_chat_settings(chat_id)).skipmode
 
 
 async def skip_on(chat_id: int):
-    skipmode[chat_id] = True
-    user = await skipdb.find_one({"chat_id": chat_id})
-    if user:
-        return await skipdb.delete_one({"chat_id": chat_id})
+    await update_chat_settings(chat_id, skipmode=True)
 
 
 async def skip_off(chat_id: int):
-    skipmode[chat_id] = False
-    user = await skipdb.find_one({"chat_id": chat_id})
-    if not user:
-        return await skipdb.insert_one({"chat_id": chat_id})
+    await update_chat_settings(chat_id, skipmode=False)
 
 
 async def get_upvote_count(chat_id: int) -> int:
-    mode = count.get(chat_id)
-    if not mode:
-        mode = await countdb.find_one({"chat_id": chat_id})
-        if not mode:
-            return 5
-        count[chat_id] = mode["mode"]
-        return mode["mode"]
-    return mode
+    return (await get_chat_settings(chat_id)).upvotes
 
 
 async def set_upvotes(chat_id: int, mode: int):
-    count[chat_id] = mode
-    await countdb.update_one(
-        {"chat_id": chat_id}, {"$set": {"mode": mode}}, upsert=True
-    )
+    await update_chat_settings(chat_id, upvotes=mode)
 
 
 async def is_autoend() -> bool:
@@ -282,76 +319,35 @@ async def set_loop(chat_id: int, mode: int):
 
 
 async def get_cmode(chat_id: int) -> int:
-    mode = channelconnect.get(chat_id)
-    if not mode:
-        mode = await channeldb.find_one({"chat_id": chat_id})
-        if not mode:
-            return None
-        channelconnect[chat_id] = mode["mode"]
-        return mode["mode"]
-    return mode
+    return (await get_chat_settings(chat_id)).cmode
 
 
 async def set_cmode(chat_id: int, mode: int):
-    channelconnect[chat_id] = mode
-    await channeldb.update_one(
-        {"chat_id": chat_id}, {"$set": {"mode": mode}}, upsert=True
-    )
+    await update_chat_settings(chat_id, cmode=mode)
 
 
 async def get_playtype(chat_id: int) -> str:
-    mode = playtype.get(chat_id)
-    if not mode:
-        mode = await playtypedb.find_one({"chat_id": chat_id})
-        if not mode:
-            playtype[chat_id] = "Everyone"
-            return "Everyone"
-        playtype[chat_id] = mode["mode"]
-        return mode["mode"]
-    return mode
+    return (await get_chat_settings(chat_id)).playtype
 
 
 async def set_playtype(chat_id: int, mode: str):
-    playtype[chat_id] = mode
-    await playtypedb.update_one(
-        {"chat_id": chat_id}, {"$set": {"mode": mode}}, upsert=True
-    )
+    await update_chat_settings(chat_id, playtype=mode)
 
 
 async def get_playmode(chat_id: int) -> str:
-    mode = playmode.get(chat_id)
-    if not mode:
-        mode = await playmodedb.find_one({"chat_id": chat_id})
-        if not mode:
-            playmode[chat_id] = "Direct"
-            return "Direct"
-        playmode[chat_id] = mode["mode"]
-        return mode["mode"]
-    return mode
+    return (await get_chat_settings(chat_id)).playmode
 
 
 async def set_playmode(chat_id: int, mode: str):
-    playmode[chat_id] = mode
-    await playmodedb.update_one(
-        {"chat_id": chat_id}, {"$set": {"mode": mode}}, upsert=True
-    )
+    await update_chat_settings(chat_id, playmode=mode)
 
 
 async def get_lang(chat_id: int) -> str:
-    mode = langm.get(chat_id)
-    if not mode:
-        lang = await langdb.find_one({"chat_id": chat_id})
-        if not lang:
-            langm[chat_id] = "en"
-            return "en"
-        langm[chat_id] = lang["lang"]
-        return lang["lang"]
-    return mode
+    return (await get_chat_settings(chat_id)).lang
 
 
 async def set_lang(chat_id: int, lang: str):
-    langm[chat_id] = lang
-    await langdb.update_one({"chat_id": chat_id}, {"$set": {"lang": lang}}, upsert=True)
+    await update_chat_settings(chat_id, lang=lang)
 
 
 async def is_music_playing(chat_id: int) -> bool:
@@ -412,51 +408,41 @@ async def remove_active_video_chat(chat_id: int):
 
 
 async def check_nonadmin_chat(chat_id: int) -> bool:
-    user = await authdb.find_one({"chat_id": chat_id})
-    if not user:
-        return False
-    return True
+    return (await get_chat_settings(chat_id)).nonadmin
 
 
 async def is_nonadmin_chat(chat_id: int) -> bool:
-    mode = nonadmin.get(chat_id)
-    if not mode:
-        user = await authdb.find_one({"chat_id": chat_id})
-        if not user:
-            nonadmin[chat_id] = False
-            return False
-        nonadmin[chat_id] = True
-        return True
-    return mode
+    return (await get_chat_settings(chat_id)).nonadmin
 
 
 async def add_nonadmin_chat(chat_id: int):
-    nonadmin[chat_id] = True
-    is_admin = await check_nonadmin_chat(chat_id)
-    if is_admin:
-        return
-    return await authdb.insert_one({"chat_id": chat_id})
+    await update_chat_settings(chat_id, nonadmin=True)
 
 
 async def remove_nonadmin_chat(chat_id: int):
-    nonadmin[chat_id] = False
-    is_admin = await check_nonadmin_chat(chat_id)
-    if not is_admin:
-        return
-    return await authdb.delete_one({"chat_id": chat_id})
+    await update_chat_settings(chat_id, nonadmin=False)
+
+
+async def load_on_off():
+    """(Re)load every on/off flag, another instance may have changed them."""
+    global onoff_loaded
+    flags = [doc["on_off"] async for doc in onoffdb.find({})]
+    onoff.clear()
+    onoff.update(flags)
+    onoff_loaded = True
 
 
 async def is_on_off(on_off: int) -> bool:
-    onoff = await onoffdb.find_one({"on_off": on_off})
-    if not onoff:
-        return False
-    return True
+    if not onoff_loaded:
+        await load_on_off()
+    return on_off in onoff
 
 
 async def add_on(on_off: int):
     is_on = await is_on_off(on_off)
     if is_on:
         return
+    onoff.add(on_off)
     return await onoffdb.insert_one({"on_off": on_off})
 
 
@@ -464,46 +450,119 @@ async def add_off(on_off: int):
     is_off = await is_on_off(on_off)
     if not is_off:
         return
+    onoff.discard(on_off)
     return await onoffdb.delete_one({"on_off": on_off})
 
 
 async def is_maintenance():
-    if not maintenance:
-        get = await onoffdb.find_one({"on_off": 1})
-        if not get:
-            maintenance.clear()
-            maintenance.append(2)
-            return True
-        else:
-            maintenance.clear()
-            maintenance.append(1)
-            return False
-    else:
-        if 1 in maintenance:
-            return False
-        else:
-            return True
+    # Flag 1 is maintenance mode; False means the bot is under maintenance.
+    return not await is_on_off(1)
 
 
 async def maintenance_off():
-    maintenance.clear()
-    maintenance.append(2)
-    is_off = await is_on_off(1)
-    if not is_off:
-        return
-    return await onoffdb.delete_one({"on_off": 1})
+    return await add_off(1)
 
 
 async def maintenance_on():
-    maintenance.clear()
-    maintenance.append(1)
-    is_on = await is_on_off(1)
-    if is_on:
-        return
-    return await onoffdb.insert_one({"on_off": 1})
+    return await add_on(1)
+
+
+class ServedBuffer:
+    """Write-behind buffer for served users/chats.
+
+    Recently seen ids are remembered so repeat visitors cost nothing, new
+    ids are upserted in batches by `flush`.
+    """
+
+    def __init__(self, collection, field: str):
+        self.collection = collection
+        self.field = field
+        self.seen = TTLCache(config.SERVED_SEEN_SIZE, 86400)
+        self.pending = set()
+        self.flushed = 0
+        self.failures = 0
+
+    def add(self, value: int):
+        if value in self.seen:
+            return
+        self.seen.set(value, True)
+        self.pending.add(value)
+
+    async def flush(self) -> int:
+        if not self.pending:
+            return 0
+        batch, self.pending = self.pending, set()
+        requests = [
+            UpdateOne({self.field: value}, {"$setOnInsert": {self.field: value}}, upsert=True)
+            for value in batch
+        ]
+        try:
+            await self.collection.bulk_write(requests, ordered=False)
+        except Exception:
+            # Keep the ids for the next flush rather than losing them.
+            self.failures += 1
+            self.pending |= batch
+            raise
+        self.flushed += len(batch)
+        return len(batch)
+
+    def stats(self) -> dict:
+        return {
+            "backlog": len(self.pending),
+            "seen": len(self.seen),
+            "flushed": self.flushed,
+            "failures": self.failures,
+        }
+
+
+served_users = ServedBuffer(usersdb, "user_id")
+served_chats = ServedBuffer(chatsdb, "chat_id")
+
+
+async def flush_served():
+    for buffer in (served_users, served_chats):
+        try:
+            await buffer.flush()
+        except Exception as e:
+            LOGGER(__name__).warning(f"Flushing served {buffer.field}s failed: {e}")
+
+
+served_counts = TTLCache(4, config.SERVED_COUNT_TTL)
+
+
+async def _iter_ids(collection, field: str, bounds: dict, batch_size: int):
+    """Yield ids in ascending order, one short query per page.
+
+    Pages are keyed on the last id seen instead of holding a cursor open, so
+    slow consumers (broadcasts sleeping on FloodWait) never hit the server's
+    idle cursor timeout and only one page is ever held in memory.
+    """
+    bounds = dict(bounds)
+    while True:
+        page = (
+            await collection.find({field: bounds}, {"_id": 0, field: 1})
+            .sort(field, 1)
+            .limit(batch_size)
+            .to_list(length=batch_size)
+        )
+        for doc in page:
+            yield doc[field]
+        if len(page) < batch_size:
+            return
+        bounds["$gt"] = page[-1][field]
+
+
+async def _count(collection, field: str, bounds: dict, cached: bool) -> int:
+    count = served_counts.get(field) if cached else None
+    if count is None:
+        count = await collection.count_documents({field: bounds})
+        served_counts.set(field, count)
+    return count
 
 
 async def is_served_user(user_id: int) -> bool:
+    if user_id in served_users.pending:
+        return True
     user = await usersdb.find_one({"user_id": user_id})
     if not user:
         return False
@@ -517,11 +576,17 @@ async def get_served_users() -> list:
     return users_list
 
 
+async def iter_served_users(batch_size: int = 1000):
+    async for user_id in _iter_ids(usersdb, "user_id", {"$gt": 0}, batch_size):
+        yield user_id
+
+
+async def count_served_users(cached: bool = True) -> int:
+    return await _count(usersdb, "user_id", {"$gt": 0}, cached)
+
+
 async def add_served_user(user_id: int):
-    is_served = await is_served_user(user_id)
-    if is_served:
-        return
-    return await usersdb.insert_one({"user_id": user_id})
+    served_users.add(user_id)
 
 
 async def get_served_chats() -> list:
@@ -531,7 +596,18 @@ async def get_served_chats() -> list:
     return chats_list
 
 
+async def iter_served_chats(batch_size: int = 1000):
+    async for chat_id in _iter_ids(chatsdb, "chat_id", {"$lt": 0}, batch_size):
+        yield chat_id
+
+
+async def count_served_chats(cached: bool = True) -> int:
+    return await _count(chatsdb, "chat_id", {"$lt": 0}, cached)
+
+
 async def is_served_chat(chat_id: int) -> bool:
+    if chat_id in served_chats.pending:
+        return True
     chat = await chatsdb.find_one({"chat_id": chat_id})
     if not chat:
         return False
@@ -539,33 +615,47 @@ async def is_served_chat(chat_id: int) -> bool:
 
 
 async def add_served_chat(chat_id: int):
-    is_served = await is_served_chat(chat_id)
-    if is_served:
-        return
-    return await chatsdb.insert_one({"chat_id": chat_id})
+    served_chats.add(chat_id)
 
 
 async def blacklisted_chats() -> list:
-    chats_list = []
-    async for chat in blacklist_chatdb.find({"chat_id": {"$lt": 0}}):
-        chats_list.append(chat["chat_id"])
-    return chats_list
+    return list(blacklisted)
+
+
+async def is_blacklisted_chat(chat_id: int) -> bool:
+    return chat_id in blacklisted
 
 
 async def blacklist_chat(chat_id: int) -> bool:
-    if not await blacklist_chatdb.find_one({"chat_id": chat_id}):
-        await blacklist_chatdb.insert_one({"chat_id": chat_id})
+    if chat_id not in blacklisted:
+        await blacklist_chatdb.update_one(
+            {"chat_id": chat_id}, {"$set": {"chat_id": chat_id}}, upsert=True
+        )
+        blacklisted.add(chat_id)
         return True
     return False
 
 
 async def whitelist_chat(chat_id: int) -> bool:
-    if await blacklist_chatdb.find_one({"chat_id": chat_id}):
+    if chat_id in blacklisted:
         await blacklist_chatdb.delete_one({"chat_id": chat_id})
+        blacklisted.discard(chat_id)
         return True
     return False
 
 
+async def load_bans():
+    """Load gbanned/blocked users and blacklisted chats once; the commands keep them in sync."""
+    blockedusers_ids.clear()
+    blockedusers_ids.update([doc["user_id"] async for doc in blockeddb.find({"user_id": {"$gt": 0}})])
+    gban_ids.clear()
+    gban_ids.update([doc["user_id"] async for doc in gbansdb.find({"user_id": {"$gt": 0}})])
+    blacklisted.clear()
+    blacklisted.update(
+        [doc["chat_id"] async for doc in blacklist_chatdb.find({"chat_id": {"$lt": 0}})]
+    )
+
+
 async def _get_authusers(chat_id: int) -> Dict[str, int]:
     _notes = await authuserdb.find_one({"chat_id": chat_id})
     if not _notes:
@@ -614,32 +704,27 @@ async def delete_authuser(chat_id: int, name: str) -> bool:
 
 
 async def get_gbanned() -> list:
-    results = []
-    async for user in gbansdb.find({"user_id": {"$gt": 0}}):
-        user_id = user["user_id"]
-        results.append(user_id)
-    return results
+    return list(gban_ids)
 
 
 async def is_gbanned_user(user_id: int) -> bool:
-    user = await gbansdb.find_one({"user_id": user_id})
-    if not user:
-        return False
-    return True
+    return user_id in gban_ids
 
 
 async def add_gban_user(user_id: int):
-    is_gbanned = await is_gbanned_user(user_id)
-    if is_gbanned:
+    if user_id in gban_ids:
         return
-    return await gbansdb.insert_one({"user_id": user_id})
+    await gbansdb.update_one(
+        {"user_id": user_id}, {"$set": {"user_id": user_id}}, upsert=True
+    )
+    gban_ids.add(user_id)
 
 
 async def remove_gban_user(user_id: int):
-    is_gbanned = await is_gbanned_user(user_id)
-    if not is_gbanned:
+    if user_id not in gban_ids:
         return
-    return await gbansdb.delete_one({"user_id": user_id})
+    await gbansdb.delete_one({"user_id": user_id})
+    gban_ids.discard(user_id)
 
 
 async def get_sudoers() -> list:
@@ -668,35 +753,75 @@ async def remove_sudo(user_id: int) -> bool:
 
 
 async def get_banned_users() -> list:
-    results = []
-    async for user in blockeddb.find({"user_id": {"$gt": 0}}):
-        user_id = user["user_id"]
-        results.append(user_id)
-    return results
+    return list(blockedusers_ids)
 
 
 async def get_banned_count() -> int:
-    users = blockeddb.find({"user_id": {"$gt": 0}})
-    users = await users.to_list(length=100000)
-    return len(users)
+    return len(blockedusers_ids)
 
 
 async def is_banned_user(user_id: int) -> bool:
-    user = await blockeddb.find_one({"user_id": user_id})
-    if not user:
-        return False
-    return True
+    return user_id in blockedusers_ids
 
 
 async def add_banned_user(user_id: int):
-    is_gbanned = await is_banned_user(user_id)
-    if is_gbanned:
+    if user_id in blockedusers_ids:
         return
-    return await blockeddb.insert_one({"user_id": user_id})
+    await blockeddb.update_one(
+        {"user_id": user_id}, {"$set": {"user_id": user_id}}, upsert=True
+    )
+    blockedusers_ids.add(user_id)
 
 
 async def remove_banned_user(user_id: int):
-    is_gbanned = await is_banned_user(user_id)
-    if not is_gbanned:
+    if user_id not in blockedusers_ids:
         return
-    return await blockeddb.delete_one({"user_id": user_id})
+    await blockeddb.delete_one({"user_id": user_id})
+    blockedusers_ids.discard(user_id)
+
+
+async def get_saved_queues() -> list:
+    return [doc async for doc in queuesdb.find({}, {"_id": 0})]
+
+
+async def save_queues(changed: dict, removed: list):
+    requests = [
+        UpdateOne({"chat_id": chat_id}, {"$set": doc}, upsert=True)
+        for chat_id, doc in changed.items()
+    ]
+    if requests:
+        await queuesdb.bulk_write(requests, ordered=False)
+    if removed:
+        await queuesdb.delete_many({"chat_id": {"$in": removed}})
+
+
+async def get_file_id(key: str) -> Union[str, None]:
+    if key in fileidm:
+        return fileidm[key]
+    entry = await fileiddb.find_one({"key": key})
+    fileidm[key] = entry["file_id"] if entry else None
+    return fileidm[key]
+
+
+async def save_file_id(key: str, file_id: str):
+    if fileidm.get(key) == file_id:
+        return
+    fileidm[key] = file_id
+    await fileiddb.update_one({"key": key}, {"$set": {"file_id": file_id}}, upsert=True)
+
+
+async def delete_file_id(key: str):
+    fileidm[key] = None
+    await fileiddb.delete_one({"key": key})
+
+
+if config.DB_METRICS:
+    # Time every public coroutine above; calls between them resolve through
+    # the module globals, so nested lookups are recorded too.
+    for _name, _func in list(globals().items()):
+        if (
+            inspect.iscoroutinefunction(_func)
+            and _func.__module__ == __name__
+            and not _name.startswith("_")
+        ):
+            globals()[_name] = db_metrics.instrument(_func)
@@ -20,6 +20,7 @@ from AnonMusic.utils.database import (
     is_maintenance,
 )
 from AnonMusic.utils.inline import botplaylist_markup
+from AnonMusic.utils.scheduler import assistant_scheduler
 from config import PLAYLIST_IMG_URL, SUPPORT_CHAT, adminlist
 from strings import get_string
 
@@ -113,7 +114,7 @@ def PlayWrapper(command):
             fplay = None
 
         if not await is_active_chat(chat_id):
-            userbot = await get_assistant(chat_id)
+            userbot = await get_assistant(chat_id, allow_move=True)
             try:
                 try:
                     try:
@@ -171,6 +172,7 @@ def PlayWrapper(command):
                 except UserAlreadyParticipant:
                     pass
                 except Exception as e:
+                    assistant_scheduler.record_error(userbot.no, e)
                     return await message.reply_text(
                         _["call_3"].format(app.mention, type(e).__name__)
                     )
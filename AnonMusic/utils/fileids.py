@@ -0,0 +1,78 @@
+import os
+import re
+
+from pyrogram.errors import (
+    FileIdInvalid,
+    FileReferenceExpired,
+    FileReferenceInvalid,
+    MediaEmpty,
+)
+from pyrogram.types import Message
+
+import config
+from AnonMusic.logging import LOGGER
+from AnonMusic.utils.database import delete_file_id, get_file_id, save_file_id
+
+# Rendered now-playing cards and bundled assets; anything else local (carbon
+# images, downloads) is unique per send and not worth remembering.
+CARD_DIR = "cache"
+CARD_NAME = re.compile(r"^[0-9A-Za-z_-]{11}_v\d+\.\w+$")
+
+ASSETS_DIR = "AnonMusic/assets"
+# Images configured once and sent over and over. Other URLs, such as per-video
+# i.ytimg.com thumbnails, are mostly sent once and would only grow the cache.
+STATIC_IMAGES = set(config.START_IMG_URLS) | {
+    value
+    for name, value in vars(config).items()
+    if name.endswith(("_IMG_URL", "_AUDIO_URL", "_VIDEO_URL")) and isinstance(value, str)
+}
+
+stats = {"uploads": 0, "reused": 0, "expired": 0}
+
+
+def photo_key(photo) -> str:
+    """Cache key for a photo that is sent again and again, or None."""
+    if not isinstance(photo, str):
+        return None
+    if photo in STATIC_IMAGES:
+        return photo
+    if photo.startswith(("http://", "https://")):
+        return None
+    path = os.path.abspath(photo)
+    name = os.path.basename(photo)
+    if os.path.dirname(path) == os.path.abspath(CARD_DIR) and CARD_NAME.match(name):
+        return f"card:{name}"
+    if path.startswith(os.path.abspath(ASSETS_DIR) + os.sep):
+        return f"asset:{os.path.relpath(path, os.path.abspath(ASSETS_DIR))}"
+    return None
+
+
+async def remember(photo, message: Message):
+    """Store the file_id Telegram assigned to `photo` when it was uploaded."""
+    key = photo_key(photo)
+    if key and message and message.photo:
+        await save_file_id(key, message.photo.file_id)
+
+
+async def send_photo(send, *args, photo, **kwargs) -> Message:
+    """Call `send(*args, photo=..., **kwargs)` reusing a known Telegram file_id.
+
+    `send` is any bound photo sender (app.send_photo, message.reply_photo).
+    The first upload of a card or config image records its file_id; later
+    sends reference it and fall back to a fresh upload once it has expired.
+    """
+    key = photo_key(photo)
+    file_id = await get_file_id(key) if key else None
+    if file_id:
+        try:
+            message = await send(*args, photo=file_id, **kwargs)
+            stats["reused"] += 1
+            return message
+        except (FileIdInvalid, FileReferenceExpired, FileReferenceInvalid, MediaEmpty) as e:
+            stats["expired"] += 1
+            LOGGER(__name__).info(f"Cached file_id for {key} no longer valid, re-uploading: {e}")
+            await delete_file_id(key)
+    message = await send(*args, photo=photo, **kwargs)
+    stats["uploads"] += 1
+    await remember(photo, message)
+    return message
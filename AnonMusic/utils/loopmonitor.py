@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+from AnonMusic.logging import LOGGER
+
+
+class LoopMonitor:
+    """Measure how long the event loop is blocked by synchronous work.
+
+    A probe sleeps for `interval` seconds; anything it oversleeps is time the
+    loop could not run callbacks. Stalls longer than `threshold` are counted
+    and the worst ones are logged.
+    """
+
+    def __init__(self, interval: float = 0.5, threshold: float = 0.1):
+        self.interval = interval
+        self.threshold = threshold
+        self.blocked = 0.0
+        self.stalls = 0
+        self.worst = 0.0
+        self.started = None
+        self._task = None
+
+    async def _probe(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = time.monotonic() - start - self.interval
+            if lag < self.threshold:
+                continue
+            self.blocked += lag
+            self.stalls += 1
+            if lag > self.worst:
+                self.worst = lag
+            if lag >= 1:
+                LOGGER(__name__).warning(f"Event loop was blocked for {lag:.2f}s")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self.started = time.monotonic()
+            self._task = asyncio.create_task(self._probe())
+
+    def stats(self) -> dict:
+        uptime = time.monotonic() - self.started if self.started else 0
+        return {
+            "blocked": round(self.blocked, 2),
+            "blocked_ratio": round(self.blocked / uptime * 100, 2) if uptime else 0,
+            "stalls": self.stalls,
+            "worst": round(self.worst, 2),
+        }
+
+
+loop_monitor = LoopMonitor()
@@ -0,0 +1,104 @@
+import random
+import time
+from collections import deque
+
+from pyrogram.errors import FloodWait
+
+import config
+
+# A FloodWait weighs as much as this many live calls while it is recent.
+FLOOD_WEIGHT = 3
+
+
+class AssistantScheduler:
+    """Choose which assistant serves a chat from its load and recent health.
+
+    Live calls are reported through `joined`/`left`, failures through
+    `record_error`. An assistant is unhealthy while a FloodWait is pending
+    or after ASSISTANT_FAILURE_LIMIT join failures in a row; either wears off
+    after ASSISTANT_HEALTH_WINDOW seconds. `pick` returns the healthy
+    assistant with the lowest score (live calls plus recent floods and
+    failures) and breaks ties at random.
+    """
+
+    def __init__(self):
+        self.window = config.ASSISTANT_HEALTH_WINDOW
+        self.failure_limit = config.ASSISTANT_FAILURE_LIMIT
+        self.calls = {}
+        self.floods = {}
+        self.failures = {}
+        self.streak = {}
+        self.cooldown = {}
+        self.moved = 0
+
+    def _recent(self, events: dict, assistant: int) -> int:
+        queue = events.get(assistant)
+        if not queue:
+            return 0
+        horizon = time.monotonic() - self.window
+        while queue and queue[0] < horizon:
+            queue.popleft()
+        return len(queue)
+
+    def joined(self, assistant: int, chat_id: int):
+        self.left(chat_id)
+        self.calls.setdefault(int(assistant), set()).add(chat_id)
+        self.streak[int(assistant)] = 0
+
+    def left(self, chat_id: int):
+        for chats in self.calls.values():
+            chats.discard(chat_id)
+
+    def record_error(self, assistant: int, error: Exception):
+        assistant = int(assistant)
+        now = time.monotonic()
+        if isinstance(error, FloodWait):
+            self.floods.setdefault(assistant, deque()).append(now)
+            self.cooldown[assistant] = max(self.cooldown.get(assistant, 0), now + int(error.value))
+            return
+        self.failures.setdefault(assistant, deque()).append(now)
+        self.streak[assistant] = self.streak.get(assistant, 0) + 1
+
+    def healthy(self, assistant: int) -> bool:
+        assistant = int(assistant)
+        if self.cooldown.get(assistant, 0) > time.monotonic():
+            return False
+        if self.streak.get(assistant, 0) >= self.failure_limit:
+            if self._recent(self.failures, assistant):
+                return False
+            self.streak[assistant] = 0
+        return True
+
+    def score(self, assistant: int) -> int:
+        return (
+            len(self.calls.get(assistant, ()))
+            + FLOOD_WEIGHT * self._recent(self.floods, assistant)
+            + self._recent(self.failures, assistant)
+        )
+
+    def pick(self, assistants: list) -> int:
+        candidates = [a for a in assistants if self.healthy(a)] or list(assistants)
+        best = min(self.score(a) for a in candidates)
+        return random.choice([a for a in candidates if self.score(a) == best])
+
+    def should_move(self, assistant: int, assistants: list) -> bool:
+        """True when `assistant` is unhealthy and another one is not."""
+        return not self.healthy(assistant) and any(
+            self.healthy(a) for a in assistants if a != assistant
+        )
+
+    def stats(self, assistants: list) -> dict:
+        now = time.monotonic()
+        return {
+            assistant: {
+                "calls": len(self.calls.get(assistant, ())),
+                "floods": self._recent(self.floods, assistant),
+                "failures": self._recent(self.failures, assistant),
+                "cooldown": max(0, round(self.cooldown.get(assistant, 0) - now)),
+                "healthy": self.healthy(assistant),
+            }
+            for assistant in assistants
+        }
+
+
+assistant_scheduler = AssistantScheduler()
@@ -0,0 +1,50 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Coalesce concurrent calls sharing a key into one running task."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            self._calls.pop(key, None)
+
+    def inflight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable], *args, **kwargs) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            self.started += 1
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            # Shielded so one caller giving up does not cancel the others.
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # The last caller giving up cancels the shared work as well.
+            if self._waiters.get(key) == 1 and not task.done():
+                task.cancel()
+                self._forget(key, task)
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                self._waiters.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "inflight": len(self._calls),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
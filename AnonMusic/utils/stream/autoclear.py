@@ -1,18 +1,179 @@
+import asyncio
+import json
 import os
+import time
 
-from config import autoclean
+import config
+from AnonMusic.logging import LOGGER
+from AnonMusic.misc import db
+
+INDEX_FILE = ".cache_index.json"
+
+
+class MediaCache:
+    """Size-budgeted LRU cache over the downloads folder.
+
+    Files referenced by any chat's queue are pinned and never evicted. The
+    access index is persisted so hot tracks survive a restart.
+    """
+
+    def __init__(self, folder: str = "downloads"):
+        self.folder = folder
+        self.budget = config.MEDIA_CACHE_SIZE * 1024 * 1024
+        self.index_path = os.path.join(folder, INDEX_FILE)
+        self.access = {}
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.trimming = False
+
+    def _key(self, path: str) -> str:
+        return os.path.basename(path)
+
+    def _owns(self, path) -> bool:
+        if not isinstance(path, str):
+            return False
+        return os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.folder)
+
+    def load(self):
+        os.makedirs(self.folder, exist_ok=True)
+        try:
+            with open(self.index_path) as f:
+                self.access = json.load(f)
+        except FileNotFoundError:
+            self.access = {}
+        except Exception as e:
+            LOGGER(__name__).warning(f"⚠️ Media cache index unreadable, rebuilding: {e}")
+            self.access = {}
+        LOGGER(__name__).info(f"🎵 Media cache loaded with {len(self.access)} indexed file(s).")
+
+    def save(self):
+        try:
+            tmp = f"{self.index_path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.access.copy(), f)
+            os.replace(tmp, self.index_path)
+        except Exception as e:
+            LOGGER(__name__).warning(f"⚠️ Failed to save media cache index: {e}")
+
+    def touch(self, path):
+        if self._owns(path):
+            self.access[self._key(path)] = time.time()
+
+    def record(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def pinned(self) -> set:
+        """Files referenced by any live queue, taken straight from `db`."""
+        refs = set()
+        for queue in list(db.values()):
+            for track in list(queue or []):
+                for field in ("file", "speed_path"):
+                    path = track.get(field)
+                    if self._owns(path):
+                        refs.add(self._key(path))
+                if "vid_" in str(track.get("file")) and track.get("vidid"):
+                    # Queued YouTube tracks stay `vid_<id>` until they play, but
+                    # their prefetched download (or .part) is already on disk.
+                    ext = "mp4" if str(track.get("streamtype")) == "video" else "mp3"
+                    name = f"{track['vidid']}.{ext}"
+                    refs.update((name, f"{name}.part"))
+        return refs
+
+    def _entries(self):
+        """Return (cached files, abandoned .part files) found on disk."""
+        entries, stale = [], []
+        now = time.time()
+        for name in os.listdir(self.folder):
+            if name.startswith(INDEX_FILE):
+                continue
+            path = os.path.join(self.folder, name)
+            if not os.path.isfile(path):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if name.endswith(".part"):
+                # Partial downloads are kept for resuming unless abandoned.
+                if now - stat.st_mtime > config.CACHE_DURATION:
+                    stale.append(name)
+                continue
+            entries.append((self.access.get(name, stat.st_mtime), name, stat.st_size))
+        return entries, stale
+
+    def size(self) -> int:
+        entries, _ = self._entries()
+        return sum(size for _, _, size in entries)
+
+    def _remove(self, name: str) -> bool:
+        try:
+            os.remove(os.path.join(self.folder, name))
+            return True
+        except OSError:
+            return False
+
+    def enforce(self, pinned: set = None) -> int:
+        """Evict least recently used, unpinned files until under budget."""
+        os.makedirs(self.folder, exist_ok=True)
+        entries, stale = self._entries()
+        for name in stale:
+            self._remove(name)
+        total = sum(size for _, _, size in entries)
+        if pinned is None:
+            pinned = self.pinned()
+        freed = 0
+        for _, name, size in sorted(entries):
+            if total <= self.budget:
+                break
+            if name in pinned or not self._remove(name):
+                continue
+            self.access.pop(name, None)
+            total -= size
+            freed += size
+            self.evicted += 1
+        present = {name for _, name, _ in entries}
+        for name in list(self.access):
+            if name not in present:
+                self.access.pop(name, None)
+        self.save()
+        return freed
+
+    async def trim(self) -> int:
+        """Run `enforce` on a worker thread, at most one at a time."""
+        if self.trimming:
+            return 0
+        self.trimming = True
+        try:
+            # Queues are read here, on the loop, not from the thread.
+            return await asyncio.to_thread(self.enforce, self.pinned())
+        finally:
+            self.trimming = False
+
+    def stats(self) -> dict:
+        entries, _ = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            "files": len(entries),
+            "size": sum(size for _, _, size in entries),
+            "budget": self.budget,
+            "pinned": len(self.pinned()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups * 100, 2) if lookups else 0,
+            "evicted": self.evicted,
+        }
+
+
+media_cache = MediaCache()
 
 
 async def auto_clean(popped):
+    """Mark a finished track as recently used; eviction happens in `enforce`."""
     try:
-        rem = popped["file"]
-        autoclean.remove(rem)
-        count = autoclean.count(rem)
-        if count == 0:
-            if "vid_" not in rem or "live_" not in rem or "index_" not in rem:
-                try:
-                    os.remove(rem)
-                except:
-                    pass
+        media_cache.touch(popped["file"])
     except:
         pass
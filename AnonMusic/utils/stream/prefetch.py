@@ -0,0 +1,92 @@
+import asyncio
+
+import config
+from AnonMusic import YouTube
+from AnonMusic.logging import LOGGER
+from AnonMusic.misc import db
+
+
+class Prefetcher:
+    """Download upcoming `vid_` queue entries while the current track plays.
+
+    `refresh(chat_id)` is idempotent: it starts downloads for the next
+    PREFETCH_AHEAD tracks and cancels any prefetch no longer among them or
+    playing, so the same call covers play, skip, shuffle and stop.
+    """
+
+    def __init__(self):
+        self.ahead = config.PREFETCH_AHEAD
+        self.semaphore = asyncio.Semaphore(config.PREFETCH_CONCURRENCY)
+        self.tasks = {}
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+
+    def _key(self, track: dict):
+        if "vid_" in str(track.get("file")):
+            return (track["vidid"], str(track["streamtype"]) == "video")
+        return None
+
+    def _wanted(self, chat_id: int) -> set:
+        wanted = set()
+        for track in (db.get(chat_id) or [])[1 : 1 + self.ahead]:
+            key = self._key(track)
+            if key:
+                wanted.add(key)
+        return wanted
+
+    async def _fetch(self, videoid: str, video: bool):
+        async with self.semaphore:
+            file_path, direct = await YouTube.download(
+                videoid, None, videoid=True, video=video
+            )
+        if file_path:
+            self.completed += 1
+
+    def refresh(self, chat_id: int):
+        if self.ahead <= 0:
+            return
+        running = self.tasks.setdefault(chat_id, {})
+        wanted = self._wanted(chat_id)
+        queue = db.get(chat_id)
+        # A track that just moved up to play is still downloading here, and
+        # the player joins that download, so it must not be cancelled.
+        playing = self._key(queue[0]) if queue else None
+        for key in list(running):
+            if (key not in wanted and key != playing) or running[key].done():
+                task = running.pop(key)
+                if not task.done():
+                    task.cancel()
+                    self.cancelled += 1
+        for key in wanted - set(running):
+            if YouTube.cached(*key):
+                continue
+            self.started += 1
+            task = asyncio.create_task(self._fetch(*key))
+            task.add_done_callback(self._log_failure)
+            running[key] = task
+        if not running:
+            self.tasks.pop(chat_id, None)
+
+    def cancel(self, chat_id: int):
+        for task in self.tasks.pop(chat_id, {}).values():
+            if not task.done():
+                task.cancel()
+                self.cancelled += 1
+
+    def _log_failure(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            LOGGER(__name__).warning(f"Prefetch failed: {task.exception()}")
+
+    def stats(self) -> dict:
+        return {
+            "active": sum(
+                1 for tasks in self.tasks.values() for task in tasks.values() if not task.done()
+            ),
+            "started": self.started,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+        }
+
+
+prefetcher = Prefetcher()
@@ -3,7 +3,9 @@ from typing import Union
 
 from AnonMusic.misc import db
 from AnonMusic.utils.formatters import check_duration, seconds_to_min
-from config import autoclean, time_to_seconds
+from AnonMusic.utils.stream.autoclear import media_cache
+from AnonMusic.utils.stream.prefetch import prefetcher
+from config import time_to_seconds
 
 
 async def put_queue(
@@ -44,7 +46,8 @@ async def put_queue(
             db[chat_id].append(put)
     else:
         db[chat_id].append(put)
-    autoclean.append(file)
+    media_cache.touch(file)
+    prefetcher.refresh(chat_id)
 
 
 async def put_queue_index(
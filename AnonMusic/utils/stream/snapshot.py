@@ -0,0 +1,185 @@
+import asyncio
+import os
+import time
+
+import config
+from AnonMusic import YouTube, app
+from AnonMusic.core.call import Anony
+from AnonMusic.logging import LOGGER
+from AnonMusic.misc import db
+from AnonMusic.utils.database import (
+    get_lang,
+    get_loop,
+    get_saved_queues,
+    save_queues,
+    set_loop,
+)
+from AnonMusic.utils.formatters import seconds_to_min
+from AnonMusic.utils.stream.prefetch import prefetcher
+from strings import get_string
+
+# Queue entry keys worth keeping; Message objects and markup state are not.
+TRACK_FIELDS = (
+    "title",
+    "dur",
+    "streamtype",
+    "by",
+    "user_id",
+    "chat_id",
+    "file",
+    "vidid",
+    "seconds",
+    "played",
+    "speed",
+    "speed_path",
+    "old_dur",
+    "old_second",
+)
+# `played` ticks every second; saving it in steps keeps an idle queue from
+# being rewritten on every snapshot, at the cost of resuming up to a step early.
+PLAYED_STEP = 30
+
+
+def compact(track: dict) -> dict:
+    doc = {key: track[key] for key in TRACK_FIELDS if track.get(key) is not None}
+    doc["played"] = int(track.get("played") or 0) // PLAYED_STEP * PLAYED_STEP
+    return doc
+
+
+class QueueSnapshots:
+    """Persist the `db` play queues so a restart can resume them.
+
+    `save` writes only chats whose compact queue changed since the last
+    write and deletes chats that stopped playing. `restore` rejoins the
+    saved calls at their position, QUEUE_RESTORE_CONCURRENCY at a time and
+    QUEUE_RESTORE_DELAY apart. Saving is held back until the restore has
+    finished, so queues not yet rejoined are not mistaken for stopped ones.
+    """
+
+    def __init__(self):
+        self.saved = {}
+        self.ready = False
+        self.writes = 0
+        self.restored = 0
+        self.failed = 0
+
+    async def _current(self) -> dict:
+        docs = {}
+        for chat_id, tracks in list(db.items()):
+            if not tracks:
+                continue
+            docs[chat_id] = {
+                "chat_id": chat_id,
+                "tracks": [compact(track) for track in tracks],
+                "loop": await get_loop(chat_id),
+            }
+        return docs
+
+    async def save(self) -> int:
+        if not self.ready:
+            return 0
+        current = await self._current()
+        changed = {chat_id: doc for chat_id, doc in current.items() if self.saved.get(chat_id) != doc}
+        removed = [chat_id for chat_id in self.saved if chat_id not in current]
+        if not changed and not removed:
+            return 0
+        stamp = time.time()
+        await save_queues({chat_id: {**doc, "saved_at": stamp} for chat_id, doc in changed.items()}, removed)
+        for chat_id in removed:
+            self.saved.pop(chat_id, None)
+        self.saved.update(changed)
+        self.writes += len(changed) + len(removed)
+        return len(changed) + len(removed)
+
+    async def _source(self, track: dict, video: bool) -> tuple:
+        """Playable link for the first track and the second to start from."""
+        file = str(track["file"])
+        played = track.get("played", 0)
+        if "live_" in file:
+            n, link = await YouTube.video(track["vidid"], True)
+            if n == 0:
+                raise ValueError(link)
+            return link, 0
+        if "index_" in file:
+            return track["vidid"], 0
+        if track.get("speed_path") and os.path.exists(track["speed_path"]):
+            return track["speed_path"], played
+        if os.path.exists(file):
+            return file, played
+        if "vid_" in file or track["vidid"] not in ("telegram", "soundcloud"):
+            file_path, direct = await YouTube.download(
+                track["vidid"], None, videoid=True, video=video
+            )
+            if file_path:
+                track["file"] = file_path
+                return file_path, played
+        raise FileNotFoundError(file)
+
+    async def _resume(self, doc: dict):
+        chat_id = doc["chat_id"]
+        if db.get(chat_id):
+            # Someone started playing before we got here.
+            return
+        tracks = [dict(track) for track in doc["tracks"]]
+        track = tracks[0]
+        video = str(track["streamtype"]) == "video"
+        link, seek = await self._source(track, video)
+        db[chat_id] = tracks
+        try:
+            await Anony.resume_call(chat_id, link, video, seek)
+        except Exception:
+            db[chat_id] = []
+            raise
+        await set_loop(chat_id, doc.get("loop", 0))
+        prefetcher.refresh(chat_id)
+        self.restored += 1
+        try:
+            _ = get_string(await get_lang(chat_id))
+            await app.send_message(
+                track.get("chat_id", chat_id),
+                _["call_11"].format(track["title"][:23], seconds_to_min(seek), len(tracks)),
+            )
+        except Exception:
+            pass
+
+    async def restore(self):
+        try:
+            docs = await get_saved_queues()
+        except Exception as e:
+            LOGGER(__name__).warning(f"Could not load saved queues: {e}")
+            docs = []
+        # Whatever is not resumed gets deleted by the next save.
+        self.saved = {
+            doc["chat_id"]: {key: value for key, value in doc.items() if key != "saved_at"}
+            for doc in docs
+        }
+        oldest = time.time() - config.QUEUE_RESTORE_MAX_AGE
+        fresh = [doc for doc in docs if doc.get("tracks") and doc.get("saved_at", 0) >= oldest]
+        semaphore = asyncio.Semaphore(config.QUEUE_RESTORE_CONCURRENCY)
+
+        async def resume(doc: dict, delay: float):
+            await asyncio.sleep(delay)
+            async with semaphore:
+                try:
+                    await self._resume(doc)
+                except Exception as e:
+                    self.failed += 1
+                    LOGGER(__name__).warning(f"Could not resume the queue of {doc['chat_id']}: {e}")
+
+        await asyncio.gather(
+            *(resume(doc, i * config.QUEUE_RESTORE_DELAY) for i, doc in enumerate(fresh))
+        )
+        self.ready = True
+        if fresh:
+            LOGGER(__name__).info(f"🔁 Resumed {self.restored} of {len(fresh)} saved queue(s).")
+
+    def stats(self) -> dict:
+        return {
+            "saved": len(self.saved),
+            "writes": self.writes,
+            "restored": self.restored,
+            "failed": self.failed,
+        }
+
+
+queue_snapshots = QueueSnapshots()
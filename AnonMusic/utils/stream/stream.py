@@ -1,3 +1,4 @@
+import asyncio
 import os
 from random import randint
 from typing import Union
@@ -10,10 +11,26 @@ from AnonMusic.core.call import Anony
 from AnonMusic.misc import db
 from AnonMusic.utils.database import add_active_video_chat, is_active_chat
 from AnonMusic.utils.exceptions import AssistantErr
+from AnonMusic.utils.formatters import time_to_seconds
 from AnonMusic.utils.inline import aq_markup, close_markup, stream_markup
 from AnonMusic.utils.pastebin import AnonyBin
 from AnonMusic.utils.stream.queue import put_queue, put_queue_index
-from AnonMusic.utils.thumbnails import get_thumb
+from AnonMusic.utils.fileids import send_photo
+from AnonMusic.utils.thumbnails import now_playing_thumb, upgrade_thumb
+
+
+def resolve_playlist(items, videoid) -> list:
+    """Start bounded concurrent YouTube.details lookups, one task per item."""
+    semaphore = asyncio.Semaphore(config.PLAYLIST_RESOLVE_CONCURRENCY)
+
+    async def resolve(search):
+        async with semaphore:
+            try:
+                return await YouTube.details(search, videoid)
+            except Exception:
+                return None
+
+    return [asyncio.ensure_future(resolve(search)) for search in items]
 
 
 async def stream(
@@ -36,83 +53,92 @@ async def stream(
     if streamtype == "playlist":
         msg = f"{_['play_19']}\n\n"
         count = 0
-        for search in result:
-            if int(count) == config.PLAYLIST_FETCH_LIMIT:
-                continue
-            try:
+        # Every item is looked up concurrently up front; awaiting them in
+        # order keeps the queue order while playback starts on the first hit.
+        lookups = resolve_playlist(result, False if spotify else True)
+        try:
+            for lookup in lookups:
+                if int(count) == config.PLAYLIST_FETCH_LIMIT:
+                    break
+                details = await lookup
+                if not details:
+                    continue
                 (
                     title,
                     duration_min,
                     duration_sec,
                     thumbnail,
                     vidid,
-                ) = await YouTube.details(search, False if spotify else True)
-            except:
-                continue
-            if str(duration_min) == "None":
-                continue
-            if duration_sec > config.DURATION_LIMIT:
-                continue
-            if await is_active_chat(chat_id):
-                await put_queue(
-                    chat_id,
-                    original_chat_id,
-                    f"vid_{vidid}",
-                    title,
-                    duration_min,
-                    user_name,
-                    vidid,
-                    user_id,
-                    "video" if video else "audio",
-                )
-                position = len(db.get(chat_id)) - 1
-                count += 1
-                msg += f"{count}. {title[:70]}\n"
-                msg += f"{_['play_20']} {position}\n\n"
-            else:
-                if not forceplay:
-                    db[chat_id] = []
-                status = True if video else None
-                try:
-                    file_path, direct = await YouTube.download(
-                        vidid, mystic, video=status, videoid=True
+                ) = details
+                if str(duration_min) == "None":
+                    continue
+                if duration_sec > config.DURATION_LIMIT:
+                    continue
+                if await is_active_chat(chat_id):
+                    await put_queue(
+                        chat_id,
+                        original_chat_id,
+                        f"vid_{vidid}",
+                        title,
+                        duration_min,
+                        user_name,
+                        vidid,
+                        user_id,
+                        "video" if video else "audio",
                     )
-                except:
-                    raise AssistantErr(_["play_14"])
-                await Anony.join_call(
-                    chat_id,
-                    original_chat_id,
-                    file_path,
-                    video=status,
-                    image=thumbnail,
-                )
-                await put_queue(
-                    chat_id,
-                    original_chat_id,
-                    file_path if direct else f"vid_{vidid}",
-                    title,
-                    duration_min,
-                    user_name,
-                    vidid,
-                    user_id,
-                    "video" if video else "audio",
-                    forceplay=forceplay,
-                )
-                img = await get_thumb(vidid)
-                button = stream_markup(_, chat_id)
-                run = await app.send_photo(
-                    original_chat_id,
-                    photo=img,
-                    caption=_["stream_1"].format(
-                        f"https://t.me/{app.username}?start=info_{vidid}",
-                        title[:23],
+                    position = len(db.get(chat_id)) - 1
+                    count += 1
+                    msg += f"{count}. {title[:70]}\n"
+                    msg += f"{_['play_20']} {position}\n\n"
+                else:
+                    if not forceplay:
+                        db[chat_id] = []
+                    status = True if video else None
+                    try:
+                        file_path, direct = await YouTube.download(
+                            vidid, mystic, video=status, videoid=True
+                        )
+                    except:
+                        raise AssistantErr(_["play_14"])
+                    await Anony.join_call(
+                        chat_id,
+                        original_chat_id,
+                        file_path,
+                        video=status,
+                        image=thumbnail,
+                    )
+                    await put_queue(
+                        chat_id,
+                        original_chat_id,
+                        file_path if direct else f"vid_{vidid}",
+                        title,
                         duration_min,
                         user_name,
-                    ),
-                    reply_markup=InlineKeyboardMarkup(button),
-                )
-                db[chat_id][0]["mystic"] = run
-                db[chat_id][0]["markup"] = "stream"
+                        vidid,
+                        user_id,
+                        "video" if video else "audio",
+                        forceplay=forceplay,
+                    )
+                    img, pending = await now_playing_thumb(vidid)
+                    button = stream_markup(_, chat_id)
+                    run = await send_photo(
+                        app.send_photo,
+                        original_chat_id,
+                        photo=img,
+                        caption=_["stream_1"].format(
+                            f"https://t.me/{app.username}?start=info_{vidid}",
+                            title[:23],
+                            duration_min,
+                            user_name,
+                        ),
+                        reply_markup=InlineKeyboardMarkup(button),
+                    )
+                    db[chat_id][0]["mystic"] = run
+                    upgrade_thumb(run, pending)
+                    db[chat_id][0]["markup"] = "stream"
+        finally:
+            for lookup in lookups:
+                lookup.cancel()
         if count == 0:
             return
         else:
@@ -124,7 +150,8 @@ async def stream(
                 car = msg
             carbon = await Carbon.generate(car, randint(100, 10000000))
             upl = close_markup(_)
-            return await app.send_photo(
+            return await send_photo(
+                app.send_photo,
                 original_chat_id,
                 photo=carbon,
                 caption=_["play_21"].format(position, link),
@@ -137,13 +164,23 @@ async def stream(
         duration_min = result["duration_min"]
         thumbnail = result["thumb"]
         status = True if video else None
+        active = await is_active_chat(chat_id)
+        growing = False
+        seconds = int(time_to_seconds(duration_min)) if duration_min else 0
         try:
-            file_path, direct = await YouTube.download(
-                vidid, mystic, videoid=True, video=status
-            )
+            if active:
+                file_path, direct = await YouTube.download(
+                    vidid, mystic, videoid=True, video=status
+                )
+            else:
+                # Nothing is playing yet, so start as soon as enough has downloaded.
+                file_path, growing = await YouTube.progressive(
+                    vidid, seconds, videoid=True, video=status
+                )
+                direct = bool(file_path)
         except:
             raise AssistantErr(_["play_14"])
-        if await is_active_chat(chat_id):
+        if active:
             await put_queue(
                 chat_id,
                 original_chat_id,
@@ -171,11 +208,13 @@ async def stream(
                 file_path,
                 video=status,
                 image=thumbnail,
+                growing=growing,
+                duration=seconds,
             )
             await put_queue(
                 chat_id,
                 original_chat_id,
-                file_path if direct else f"vid_{vidid}",
+                YouTube.final(file_path) if direct else f"vid_{vidid}",
                 title,
                 duration_min,
                 user_name,
@@ -184,9 +223,10 @@ async def stream(
                 "video" if video else "audio",
                 forceplay=forceplay,
             )
-            img = await get_thumb(vidid)
+            img, pending = await now_playing_thumb(vidid)
             button = stream_markup(_, chat_id)
-            run = await app.send_photo(
+            run = await send_photo(
+                app.send_photo,
                 original_chat_id,
                 photo=img,
                 caption=_["stream_1"].format(
@@ -198,6 +238,7 @@ async def stream(
                 reply_markup=InlineKeyboardMarkup(button),
             )
             db[chat_id][0]["mystic"] = run
+            upgrade_thumb(run, pending)
             db[chat_id][0]["markup"] = "stream"
     elif streamtype == "soundcloud":
         file_path = result["filepath"]
@@ -239,7 +280,8 @@ async def stream(
                 forceplay=forceplay,
             )
             button = stream_markup(_, chat_id)
-            run = await app.send_photo(
+            run = await send_photo(
+                app.send_photo,
                 original_chat_id,
                 photo=config.SOUNCLOUD_IMG_URL,
                 caption=_["stream_1"].format(
@@ -293,7 +335,8 @@ async def stream(
             if video:
                 await add_active_video_chat(chat_id)
             button = stream_markup(_, chat_id)
-            run = await app.send_photo(
+            run = await send_photo(
+                app.send_photo,
                 original_chat_id,
                 photo=config.TELEGRAM_VIDEO_URL if video else config.TELEGRAM_AUDIO_URL,
                 caption=_["stream_1"].format(link, title[:23], duration_min, user_name),
@@ -352,9 +395,10 @@ async def stream(
                 "video" if video else "audio",
                 forceplay=forceplay,
             )
-            img = await get_thumb(vidid)
+            img, pending = await now_playing_thumb(vidid)
             button = stream_markup(_, chat_id)
-            run = await app.send_photo(
+            run = await send_photo(
+                app.send_photo,
                 original_chat_id,
                 photo=img,
                 caption=_["stream_1"].format(
@@ -366,6 +410,7 @@ async def stream(
                 reply_markup=InlineKeyboardMarkup(button),
             )
             db[chat_id][0]["mystic"] = run
+            upgrade_thumb(run, pending)
             db[chat_id][0]["markup"] = "tg"
     elif streamtype == "index":
         link = result
@@ -409,7 +454,8 @@ async def stream(
                 forceplay=forceplay,
             )
             button = stream_markup(_, chat_id)
-            run = await app.send_photo(
+            run = await send_photo(
+                app.send_photo,
                 original_chat_id,
                 photo=config.STREAM_IMG_URL,
                 caption=_["stream_2"].format(user_name),
@@ -1,12 +1,19 @@
+import asyncio
+import multiprocessing
 import os
 import re
 import aiofiles
-import aiohttp
 import logging
-from PIL import Image, ImageDraw, ImageEnhance, ImageFilter, ImageFont, ImageOps
-from youtubesearchpython.__future__ import VideosSearch
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pyrogram.types import InputMediaPhoto
+import config
 from config import YOUTUBE_IMG_URL
-from AnonMusic import app
+from AnonMusic import YouTube, app
+from AnonMusic.core.http import http_client
+from AnonMusic.utils.fileids import CARD_NAME, remember
+from AnonMusic.utils.singleflight import SingleFlight
+from workers import render_thumb
 
 # Logging Setup
 logging.basicConfig(level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -15,53 +22,93 @@ logging.basicConfig(level=logging.ERROR, format='%(asctime)s - %(levelname)s - %
 CACHE_DIR = "cache"
 os.makedirs(CACHE_DIR, exist_ok=True)
 
-# Layout Constants
-PANEL_W, PANEL_H = 800, 600
-PANEL_X = (1280 - PANEL_W) // 2
-PANEL_Y = 50
-TRANSPARENCY = 180
-INNER_OFFSET = 40
+# Bump when the card layout changes so stale renders are not served.
+CARD_VERSION = 6
 
-THUMB_W, THUMB_H = 600, 300
-THUMB_X = PANEL_X + (PANEL_W - THUMB_W) // 2
-THUMB_Y = PANEL_Y + INNER_OFFSET
+# Concurrent requests for the same videoid share one download and render.
+thumbs_flight = SingleFlight()
+card_stats = {"hits": 0, "misses": 0, "evicted": 0}
 
-TITLE_X = THUMB_X
-META_X = THUMB_X
-TITLE_Y = THUMB_Y + THUMB_H + 20
-META_Y = TITLE_Y + 50
+# Render pool, created on first use. Renders waiting for a worker are counted
+# so a burst of track changes falls back to raw thumbnails instead of piling up.
+_executor = None
+_queued = 0
+# Keeps now-playing updates alive until they finish.
+_upgrades = set()
 
-BAR_X, BAR_Y = THUMB_X, META_Y + 40
-BAR_RED_LEN = 300
-BAR_TOTAL_LEN = 600
 
-ICONS_W, ICONS_H = 450, 60
-ICONS_X = PANEL_X + (PANEL_W - ICONS_W) // 2
-ICONS_Y = BAR_Y + 60
+def _render_pool() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # Spawned, not forked: see workers.py.
+        _executor = ProcessPoolExecutor(
+            max_workers=config.THUMB_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
 
-MAX_TITLE_WIDTH = PANEL_W - 100
 
+def _drop_pool(pool: ProcessPoolExecutor):
+    """Forget a broken pool so the next render starts a fresh one."""
+    global _executor
+    if _executor is pool:
+        _executor = None
+        pool.shutdown(wait=False, cancel_futures=True)
 
-def trim_to_width(text: str, font: ImageFont.FreeTypeFont, max_w: int) -> str:
-    ellipsis = "…"
-    text = text[:50]  # Limit title to 50 characters
-    if font.getlength(text) <= max_w:
-        return text
-    for i in range(len(text) - 1, 0, -1):
-        if font.getlength(text[:i] + ellipsis) <= max_w:
-            return text[:i] + ellipsis
-    return ellipsis
 
+def _render_done(thumb_path: str):
+    global _queued
+    _queued -= 1
+    try:
+        os.remove(thumb_path)
+    except Exception as e:
+        logging.error(f"Cleanup error: {e}")
 
-async def get_thumb(videoid: str) -> str:
-    cache_path = os.path.join(CACHE_DIR, f"{videoid}_v5.png")
-    if os.path.exists(cache_path):
-        return cache_path
 
+def card_path(videoid: str) -> str:
+    return os.path.join(CACHE_DIR, f"{videoid}_v{CARD_VERSION}.{config.THUMB_FORMAT}")
+
+
+def enforce_thumb_cache() -> int:
+    """Drop least recently used cards beyond THUMB_CACHE_SIZE MB or THUMB_CACHE_COUNT files."""
+    cards = []
+    for name in os.listdir(CACHE_DIR):
+        if not CARD_NAME.match(name):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        cards.append((stat.st_mtime, path, stat.st_size))
+    budget = config.THUMB_CACHE_SIZE * 1024 * 1024
+    total = sum(size for _, _, size in cards)
+    count = len(cards)
+    removed = 0
+    for _, path, size in sorted(cards):
+        if total <= budget and count <= config.THUMB_CACHE_COUNT:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        count -= 1
+        removed += 1
+    card_stats["evicted"] += removed
+    return removed
+
+
+def shutdown_render_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+
+
+async def _metadata(videoid: str) -> tuple:
     try:
-        results = VideosSearch(f"https://www.youtube.com/watch?v={videoid}", limit=1)
-        results_data = await results.next()
-        data = results_data["result"][0]
+        data = (await YouTube.search(f"https://www.youtube.com/watch?v={videoid}"))[0]
         title = re.sub(r"\W+", " ", data.get("title", "Unsupported Title")).title()
         thumbnail = data.get("thumbnails", [{}])[0].get("url", YOUTUBE_IMG_URL)
         duration = data.get("duration")
@@ -69,116 +116,126 @@ async def get_thumb(videoid: str) -> str:
     except Exception as e:
         logging.error(f"Error fetching YouTube data: {e}")
         title, thumbnail, duration, views = "Unsupported Title", YOUTUBE_IMG_URL, None, "Unknown Views"
+    return title, thumbnail, duration, views
+
+
+async def get_thumb(videoid: str) -> str:
+    cache_path = card_path(videoid)
+    if os.path.exists(cache_path):
+        card_stats["hits"] += 1
+        try:
+            # mtime doubles as the last use for eviction.
+            os.utime(cache_path)
+        except OSError:
+            pass
+        return cache_path
+    card_stats["misses"] += 1
+    return await thumbs_flight.do(videoid, _render_card, videoid, cache_path)
+
+
+async def _render_card(videoid: str, cache_path: str) -> str:
+    title, thumbnail, duration, views = await _metadata(videoid)
 
     is_live = not duration or str(duration).strip().lower() in {"", "live", "live now"}
     duration_text = "🔴 LIVE" if is_live else duration or "Unknown Mins"
 
+    global _queued
+    if _queued >= config.THUMB_QUEUE_SIZE:
+        logging.error("Thumbnail render queue is full, using the raw thumbnail")
+        return thumbnail
+
     thumb_path = os.path.join(CACHE_DIR, f"thumb_{videoid}.jpg")
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(thumbnail) as resp:
-                if resp.status == 200:
-                    async with aiofiles.open(thumb_path, "wb") as f:
-                        await f.write(await resp.read())
-                else:
-                    logging.error(f"Failed to download thumbnail (HTTP {resp.status})")
-                    return YOUTUBE_IMG_URL
+        async with http_client.session.get(thumbnail) as resp:
+            if resp.status == 200:
+                async with aiofiles.open(thumb_path, "wb") as f:
+                    await f.write(await resp.read())
+            else:
+                logging.error(f"Failed to download thumbnail (HTTP {resp.status})")
+                return YOUTUBE_IMG_URL
     except Exception as e:
         logging.error(f"Download error: {e}")
         return YOUTUBE_IMG_URL
 
+    pool = _render_pool()
     try:
-        base = Image.open(thumb_path).resize((1280, 720)).convert("RGBA")
-        bg = ImageEnhance.Brightness(base.filter(ImageFilter.GaussianBlur(15))).enhance(0.5)
+        future = asyncio.get_running_loop().run_in_executor(
+            pool,
+            render_thumb,
+            thumb_path,
+            cache_path,
+            title,
+            views,
+            duration_text,
+            is_live,
+            app.username,
+            config.THUMB_QUALITY,
+        )
     except Exception as e:
-        logging.error(f"Image processing error: {e}")
-        return YOUTUBE_IMG_URL
-
-    # Frosted Gradient Panel
+        logging.error(f"Could not submit thumbnail render: {e}")
+        _drop_pool(pool)
+        try:
+            os.remove(thumb_path)
+        except OSError:
+            pass
+        return thumbnail
+    _queued += 1
+    # The worker may still be reading the source after a timeout, clean up
+    # only once it is really done.
+    future.add_done_callback(lambda _: _render_done(thumb_path))
     try:
-        panel_area = bg.crop((PANEL_X, PANEL_Y, PANEL_X + PANEL_W, PANEL_Y + PANEL_H))
-        gradient = Image.new("RGBA", (PANEL_W, PANEL_H), color=0)
-        for y in range(PANEL_H):
-            r = 255
-            g = 255 - int((y / PANEL_H) * 80)
-            b = 255 - int((y / PANEL_H) * 120)
-            a = TRANSPARENCY
-            for x in range(PANEL_W):
-                gradient.putpixel((x, y), (r, g, b, a))
-        frosted = Image.alpha_composite(panel_area, gradient)
-        mask = Image.new("L", (PANEL_W, PANEL_H), 0)
-        ImageDraw.Draw(mask).rounded_rectangle((0, 0, PANEL_W, PANEL_H), 35, fill=255)
-        bg.paste(frosted, (PANEL_X, PANEL_Y), mask)
+        path = await asyncio.wait_for(
+            asyncio.shield(future), config.THUMB_RENDER_TIMEOUT
+        )
+        if not path:
+            return YOUTUBE_IMG_URL
+        enforce_thumb_cache()
+        return path
+    except asyncio.TimeoutError:
+        logging.error(f"Thumbnail render for {videoid} timed out")
+        return thumbnail
+    except BrokenProcessPool as e:
+        logging.error(f"Render worker died: {e}")
+        _drop_pool(pool)
+        return thumbnail
     except Exception as e:
-        logging.error(f"Panel error: {e}")
-
-    # Thumbnail with Border
-    try:
-        thumb = ImageOps.fit(base, (THUMB_W, THUMB_H), method=Image.Resampling.LANCZOS)
-        tmask = Image.new("L", thumb.size, 0)
-        ImageDraw.Draw(tmask).rounded_rectangle((0, 0, THUMB_W, THUMB_H), 25, fill=255)
+        logging.error(f"Render error: {e}")
+        return YOUTUBE_IMG_URL
 
-        border = Image.new("RGBA", (THUMB_W + 10, THUMB_H + 10), (0, 0, 0, 0))
-        bmask = Image.new("L", (THUMB_W + 10, THUMB_H + 10), 0)
-        ImageDraw.Draw(bmask).rounded_rectangle((0, 0, THUMB_W + 10, THUMB_H + 10), 30, fill=255)
 
-        bg.paste(border, (THUMB_X - 5, THUMB_Y - 5), bmask)
-        bg.paste(thumb, (THUMB_X, THUMB_Y), tmask)
-    except Exception as e:
-        logging.error(f"Thumbnail error: {e}")
+async def now_playing_thumb(videoid: str) -> tuple:
+    """Return (photo, pending) for a now-playing message.
 
+    Waits up to THUMB_WAIT seconds for the rendered card. After that the raw
+    YouTube thumbnail is returned along with the still running render, which
+    `upgrade_thumb` swaps in once ready.
+    """
+    render = asyncio.ensure_future(get_thumb(videoid))
     try:
-        title_font = ImageFont.truetype("AnonMusic/assets/thumb/font2.ttf", 30)
-        meta_font = ImageFont.truetype("AnonMusic/assets/thumb/font.ttf", 22)
-        draw = ImageDraw.Draw(bg)
+        return await asyncio.wait_for(asyncio.shield(render), config.THUMB_WAIT), None
+    except asyncio.TimeoutError:
+        title, thumbnail, duration, views = await _metadata(videoid)
+        return thumbnail, render
 
-        title_text = trim_to_width(title, title_font, MAX_TITLE_WIDTH)
-        draw.text((TITLE_X, TITLE_Y), title_text, fill="white", font=title_font)
 
-        draw.text((META_X, META_Y), f"YouTube | {views}           Player : @{app.username}", fill="#FF0000", font=meta_font)
-
-        if is_live:
-            live_font = ImageFont.truetype("AnonMusic/assets/thumb/font2.ttf", 22)
-            draw.ellipse((META_X + 200, META_Y - 5, META_X + 225, META_Y + 20), fill=(255, 0, 0, 255))
-            draw.text((META_X + 230, META_Y), "LIVE", fill="red", font=live_font)
-    except Exception as e:
-        logging.error(f"Text rendering error: {e}")
-
-    # Progress Bar
+async def _upgrade(message, pending: asyncio.Future):
     try:
-        draw.line([(BAR_X, BAR_Y), (BAR_X + BAR_RED_LEN, BAR_Y)], fill="#FF0000", width=10)
-        draw.ellipse([(BAR_X - 5, BAR_Y - 5), (BAR_X + 5, BAR_Y + 5)], fill="#FF0000")
-        draw.line([(BAR_X + BAR_RED_LEN, BAR_Y), (BAR_X + BAR_TOTAL_LEN, BAR_Y)], fill="#555555", width=6)
-        draw.ellipse([(BAR_X + BAR_TOTAL_LEN - 5, BAR_Y - 5), (BAR_X + BAR_TOTAL_LEN + 5, BAR_Y + 5)], fill="#555555")
-
-        draw.text((BAR_X, BAR_Y + 20), "00:00", fill="white", font=meta_font)
-        draw.text((BAR_X + BAR_TOTAL_LEN - 100, BAR_Y + 20), duration_text,
-                  fill="#FF0000" if is_live else "white", font=meta_font)
+        photo = await pending
+        if not photo or not os.path.isfile(photo):
+            return
+        edited = await message.edit_media(
+            InputMediaPhoto(photo, caption=message.caption.html if message.caption else None),
+            reply_markup=message.reply_markup,
+        )
+        await remember(photo, edited)
     except Exception as e:
-        logging.error(f"Progress bar error: {e}")
+        logging.error(f"Thumbnail update error: {e}")
 
-    # Icons
-    try:
-        icons_path = "AnonMusic/assets/thumb/play_icons.png"
-        if os.path.isfile(icons_path):
-            icons = Image.open(icons_path).resize((ICONS_W, ICONS_H)).convert("RGBA")
-        else:
-            icons = Image.new("RGBA", (ICONS_W, ICONS_H), (0, 0, 0, 0))
-            d = ImageDraw.Draw(icons)
-            d.polygon([(20, 10), (20, 50), (60, 30)], fill="white")
-        bg.paste(icons, (ICONS_X, ICONS_Y), icons)
-    except Exception as e:
-        logging.error(f"Icons error: {e}")
 
-    # Save and Cleanup
-    try:
-        os.remove(thumb_path)
-    except Exception as e:
-        logging.error(f"Cleanup error: {e}")
-
-    try:
-        bg.save(cache_path, quality=95)
-        return cache_path
-    except Exception as e:
-        logging.error(f"Save error: {e}")
-        return YOUTUBE_IMG_URL
+def upgrade_thumb(message, pending: asyncio.Future):
+    """Replace the raw thumbnail on `message` with the card once rendered."""
+    if message is None or pending is None:
+        return
+    task = asyncio.create_task(_upgrade(message, pending))
+    _upgrades.add(task)
+    task.add_done_callback(_upgrades.discard)
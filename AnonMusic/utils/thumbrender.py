@@ -0,0 +1,206 @@
+import logging
+import os
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter, ImageFont, ImageOps
+
+# Only PIL/NumPy here: this module renders the now-playing card and must stay
+# importable on its own (worker processes, bench/).
+
+ASSETS_DIR = "AnonMusic/assets/thumb"
+
+# Layout Constants
+PANEL_W, PANEL_H = 800, 600
+PANEL_X = (1280 - PANEL_W) // 2
+PANEL_Y = 50
+TRANSPARENCY = 180
+INNER_OFFSET = 40
+
+THUMB_W, THUMB_H = 600, 300
+THUMB_X = PANEL_X + (PANEL_W - THUMB_W) // 2
+THUMB_Y = PANEL_Y + INNER_OFFSET
+
+TITLE_X = THUMB_X
+META_X = THUMB_X
+TITLE_Y = THUMB_Y + THUMB_H + 20
+META_Y = TITLE_Y + 50
+
+BAR_X, BAR_Y = THUMB_X, META_Y + 40
+BAR_RED_LEN = 300
+BAR_TOTAL_LEN = 600
+
+ICONS_W, ICONS_H = 450, 60
+ICONS_X = PANEL_X + (PANEL_W - ICONS_W) // 2
+ICONS_Y = BAR_Y + 60
+
+MAX_TITLE_WIDTH = PANEL_W - 100
+
+OUTPUT_FORMATS = {".jpg": "JPEG", ".jpeg": "JPEG", ".webp": "WEBP", ".png": "PNG"}
+
+
+def trim_to_width(text: str, font: ImageFont.FreeTypeFont, max_w: int) -> str:
+    ellipsis = "…"
+    text = text[:50]  # Limit title to 50 characters
+    if font.getlength(text) <= max_w:
+        return text
+    for i in range(len(text) - 1, 0, -1):
+        if font.getlength(text[:i] + ellipsis) <= max_w:
+            return text[:i] + ellipsis
+    return ellipsis
+
+
+def rounded_mask(size: tuple, radius: int) -> Image.Image:
+    mask = Image.new("L", size, 0)
+    ImageDraw.Draw(mask).rounded_rectangle((0, 0) + size, radius, fill=255)
+    return mask
+
+
+def panel_gradient() -> Image.Image:
+    """White to peach vertical gradient, one row value broadcast across the width."""
+    rows = np.arange(PANEL_H) / PANEL_H
+    gradient = np.empty((PANEL_H, PANEL_W, 4), dtype=np.uint8)
+    gradient[..., 0] = 255
+    gradient[..., 1] = (255 - (rows * 80).astype(np.int64))[:, None]
+    gradient[..., 2] = (255 - (rows * 120).astype(np.int64))[:, None]
+    gradient[..., 3] = TRANSPARENCY
+    return Image.fromarray(gradient, "RGBA")
+
+
+def play_icons() -> Image.Image:
+    icons_path = os.path.join(ASSETS_DIR, "play_icons.png")
+    if os.path.isfile(icons_path):
+        return Image.open(icons_path).resize((ICONS_W, ICONS_H)).convert("RGBA")
+    icons = Image.new("RGBA", (ICONS_W, ICONS_H), (0, 0, 0, 0))
+    ImageDraw.Draw(icons).polygon([(20, 10), (20, 50), (60, 30)], fill="white")
+    return icons
+
+
+@lru_cache(maxsize=1)
+def static_layers() -> dict:
+    """Track independent parts of the card, built once per process."""
+    return {
+        "gradient": panel_gradient(),
+        "panel_mask": rounded_mask((PANEL_W, PANEL_H), 35),
+        "thumb_mask": rounded_mask((THUMB_W, THUMB_H), 25),
+        "border": Image.new("RGBA", (THUMB_W + 10, THUMB_H + 10), (0, 0, 0, 0)),
+        "border_mask": rounded_mask((THUMB_W + 10, THUMB_H + 10), 30),
+        "icons": play_icons(),
+        "title_font": ImageFont.truetype(os.path.join(ASSETS_DIR, "font2.ttf"), 30),
+        "meta_font": ImageFont.truetype(os.path.join(ASSETS_DIR, "font.ttf"), 22),
+        "live_font": ImageFont.truetype(os.path.join(ASSETS_DIR, "font2.ttf"), 22),
+    }
+
+
+# Render stages, kept separate so bench/thumbnails.py can time each one.
+
+
+def load_background(thumb_path: str) -> tuple:
+    base = Image.open(thumb_path).resize((1280, 720)).convert("RGBA")
+    bg = ImageEnhance.Brightness(base.filter(ImageFilter.GaussianBlur(15))).enhance(0.5)
+    return base, bg
+
+
+def draw_panel(bg: Image.Image, layers: dict):
+    panel_area = bg.crop((PANEL_X, PANEL_Y, PANEL_X + PANEL_W, PANEL_Y + PANEL_H))
+    frosted = Image.alpha_composite(panel_area, layers["gradient"])
+    bg.paste(frosted, (PANEL_X, PANEL_Y), layers["panel_mask"])
+
+
+def draw_thumb(bg: Image.Image, base: Image.Image, layers: dict):
+    thumb = ImageOps.fit(base, (THUMB_W, THUMB_H), method=Image.Resampling.LANCZOS)
+    bg.paste(layers["border"], (THUMB_X - 5, THUMB_Y - 5), layers["border_mask"])
+    bg.paste(thumb, (THUMB_X, THUMB_Y), layers["thumb_mask"])
+
+
+def draw_text(draw: ImageDraw.ImageDraw, layers: dict, title: str, views: str, is_live: bool, username: str):
+    title_text = trim_to_width(title, layers["title_font"], MAX_TITLE_WIDTH)
+    draw.text((TITLE_X, TITLE_Y), title_text, fill="white", font=layers["title_font"])
+
+    draw.text((META_X, META_Y), f"YouTube | {views}           Player : @{username}", fill="#FF0000", font=layers["meta_font"])
+
+    if is_live:
+        draw.ellipse((META_X + 200, META_Y - 5, META_X + 225, META_Y + 20), fill=(255, 0, 0, 255))
+        draw.text((META_X + 230, META_Y), "LIVE", fill="red", font=layers["live_font"])
+
+
+def draw_bar(draw: ImageDraw.ImageDraw, layers: dict, duration_text: str, is_live: bool):
+    meta_font = layers["meta_font"]
+    draw.line([(BAR_X, BAR_Y), (BAR_X + BAR_RED_LEN, BAR_Y)], fill="#FF0000", width=10)
+    draw.ellipse([(BAR_X - 5, BAR_Y - 5), (BAR_X + 5, BAR_Y + 5)], fill="#FF0000")
+    draw.line([(BAR_X + BAR_RED_LEN, BAR_Y), (BAR_X + BAR_TOTAL_LEN, BAR_Y)], fill="#555555", width=6)
+    draw.ellipse([(BAR_X + BAR_TOTAL_LEN - 5, BAR_Y - 5), (BAR_X + BAR_TOTAL_LEN + 5, BAR_Y + 5)], fill="#555555")
+
+    draw.text((BAR_X, BAR_Y + 20), "00:00", fill="white", font=meta_font)
+    draw.text((BAR_X + BAR_TOTAL_LEN - 100, BAR_Y + 20), duration_text,
+              fill="#FF0000" if is_live else "white", font=meta_font)
+
+
+def draw_icons(bg: Image.Image, layers: dict):
+    bg.paste(layers["icons"], (ICONS_X, ICONS_Y), layers["icons"])
+
+
+def save_card(bg: Image.Image, cache_path: str, quality: int):
+    fmt = OUTPUT_FORMATS.get(os.path.splitext(cache_path)[1].lower(), "PNG")
+    if fmt == "JPEG":
+        bg = bg.convert("RGB")
+    # Written aside and renamed so a half-written card is never served.
+    tmp_path = f"{cache_path}.tmp"
+    bg.save(tmp_path, fmt, quality=quality, optimize=fmt == "JPEG")
+    os.replace(tmp_path, cache_path)
+
+
+def render_thumb(
+    thumb_path: str,
+    cache_path: str,
+    title: str,
+    views: str,
+    duration_text: str,
+    is_live: bool,
+    username: str,
+    quality: int = 95,
+):
+    """Render the now-playing card for a downloaded YouTube thumbnail.
+
+    The output format follows the extension of `cache_path` (jpg, webp or
+    png). Returns `cache_path`, or None if the source image could not be used.
+    """
+    layers = static_layers()
+    try:
+        base, bg = load_background(thumb_path)
+    except Exception as e:
+        logging.error(f"Image processing error: {e}")
+        return None
+
+    # Frosted Gradient Panel
+    try:
+        draw_panel(bg, layers)
+    except Exception as e:
+        logging.error(f"Panel error: {e}")
+
+    # Thumbnail with Border
+    try:
+        draw_thumb(bg, base, layers)
+    except Exception as e:
+        logging.error(f"Thumbnail error: {e}")
+
+    draw = ImageDraw.Draw(bg)
+    try:
+        draw_text(draw, layers, title, views, is_live, username)
+    except Exception as e:
+        logging.error(f"Text rendering error: {e}")
+
+    # Progress Bar
+    try:
+        draw_bar(draw, layers, duration_text, is_live)
+    except Exception as e:
+        logging.error(f"Progress bar error: {e}")
+
+    # Icons
+    try:
+        draw_icons(bg, layers)
+    except Exception as e:
+        logging.error(f"Icons error: {e}")
+
+    save_card(bg, cache_path, quality)
+    return cache_path
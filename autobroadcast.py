@@ -4,7 +4,7 @@ from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 from config import AUTO_GCAST, AUTO_GCAST_MSG, LOG_GROUP_ID
 from ANONMUSIC import app
-from ANONMUSIC.utils.database import get_served_chats
+from ANONMUSIC.utils.database import iter_served_chats
 
 # Convert AUTO_GCAST to boolean based on "On" or "Off"
 AUTO_GCASTS = AUTO_GCAST.strip().lower() == "on"
@@ -44,10 +44,7 @@ async def send_text_once():
 
 async def send_message_to_chats():
     try:
-        chats = await get_served_chats()
-
-        for chat_info in chats:
-            chat_id = chat_info.get("chat_id")
+        async for chat_id in iter_served_chats():
             if isinstance(chat_id, int):  # Check if chat_id is an integer
                 try:
                     await app.send_photo(
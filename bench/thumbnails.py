@@ -0,0 +1,301 @@
+"""Offline benchmark suite for the now-playing card and image pipeline.
+
+Run from the repository root:
+
+    python bench/thumbnails.py [--runs 30] [--only panel,trim] [--json out.json]
+    python bench/thumbnails.py --baseline out.json [--tolerance 0.25]
+
+Uses the fonts and icon strip bundled in AnonMusic/assets/thumb plus a
+synthetic worst-case photo, and needs only Pillow and NumPy: no bot session,
+network or database. Every stage runs in its own forked process, so the peak
+RSS reported belongs to that stage alone. With --baseline the run exits
+non-zero when a stage's p50 regressed by more than --tolerance.
+"""
+import argparse
+import importlib.util
+import json
+import math
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+LONG_TITLE = "Extremely Long Official Music Video Title Feat Several Artists Remastered"
+
+
+def load_renderer():
+    # Loaded by path so the AnonMusic package (and its clients) is not started.
+    path = os.path.join("AnonMusic", "utils", "thumbrender.py")
+    spec = importlib.util.spec_from_file_location("thumbrender", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+tr = load_renderer()
+
+
+def legacy_panel(bg):
+    """The per-render putpixel panel get_thumb used before static layers."""
+    panel_area = bg.crop((tr.PANEL_X, tr.PANEL_Y, tr.PANEL_X + tr.PANEL_W, tr.PANEL_Y + tr.PANEL_H))
+    gradient = Image.new("RGBA", (tr.PANEL_W, tr.PANEL_H), color=0)
+    for y in range(tr.PANEL_H):
+        r = 255
+        g = 255 - int((y / tr.PANEL_H) * 80)
+        b = 255 - int((y / tr.PANEL_H) * 120)
+        a = tr.TRANSPARENCY
+        for x in range(tr.PANEL_W):
+            gradient.putpixel((x, y), (r, g, b, a))
+    frosted = Image.alpha_composite(panel_area, gradient)
+    mask = Image.new("L", (tr.PANEL_W, tr.PANEL_H), 0)
+    ImageDraw.Draw(mask).rounded_rectangle((0, 0, tr.PANEL_W, tr.PANEL_H), 35, fill=255)
+    bg.paste(frosted, (tr.PANEL_X, tr.PANEL_Y), mask)
+    return gradient
+
+
+def prepare_sources(folder: str) -> dict:
+    """A noisy photo (hardest to compress) and the bundled icon strip as a photo."""
+    noise = os.path.join(folder, "noise.jpg")
+    pixels = np.random.default_rng(0).integers(0, 256, (360, 480, 3), dtype=np.uint8)
+    Image.fromarray(pixels, "RGB").save(noise, quality=90)
+    asset = os.path.join(folder, "asset.jpg")
+    icons = Image.open(os.path.join(tr.ASSETS_DIR, "play_icons.png")).convert("RGBA")
+    canvas = Image.new("RGBA", (480, 360), (30, 30, 30, 255))
+    canvas.alpha_composite(icons.resize((480, 64)), (0, 148))
+    canvas.convert("RGB").save(asset, quality=90)
+    return {"noise": noise, "asset": asset}
+
+
+# Each stage takes the prepared context and returns (callable, output path or None).
+
+
+def stage_static_layers(ctx):
+    def run():
+        tr.static_layers.cache_clear()
+        tr.static_layers()
+    return run, None
+
+
+def stage_load_background(ctx):
+    return lambda: tr.load_background(ctx["noise"]), None
+
+
+def stage_panel(ctx):
+    layers = tr.static_layers()
+    return lambda: tr.draw_panel(ctx["bg"].copy(), layers), None
+
+
+def stage_panel_legacy(ctx):
+    return lambda: legacy_panel(ctx["bg"].copy()), None
+
+
+def stage_thumb(ctx):
+    layers = tr.static_layers()
+    return lambda: tr.draw_thumb(ctx["bg"].copy(), ctx["base"], layers), None
+
+
+def stage_trim(ctx):
+    font = tr.static_layers()["title_font"]
+    return lambda: tr.trim_to_width(LONG_TITLE, font, tr.MAX_TITLE_WIDTH), None
+
+
+def stage_text(ctx):
+    layers = tr.static_layers()
+
+    def run():
+        draw = ImageDraw.Draw(ctx["bg"].copy())
+        tr.draw_text(draw, layers, LONG_TITLE, "1.2M views", False, "bench")
+    return run, None
+
+
+def stage_bar_icons(ctx):
+    layers = tr.static_layers()
+
+    def run():
+        bg = ctx["bg"].copy()
+        tr.draw_bar(ImageDraw.Draw(bg), layers, "4:20", False)
+        tr.draw_icons(bg, layers)
+    return run, None
+
+
+def stage_save(ext: str, quality: int):
+    def stage(ctx):
+        out = os.path.join(ctx["folder"], f"save.{ext}")
+        return lambda: tr.save_card(ctx["bg"], out, quality), out
+    return stage
+
+
+def stage_render(source: str, ext: str, quality: int):
+    def stage(ctx):
+        out = os.path.join(ctx["folder"], f"card_{source}.{ext}")
+        return (
+            lambda: tr.render_thumb(ctx[source], out, LONG_TITLE, "1.2M views", "4:20", False, "bench", quality),
+            out,
+        )
+    return stage
+
+
+def stage_carbon(ctx):
+    # Carbon images are rendered by the remote API; locally only the
+    # response is written to cache/, which is what this measures.
+    payload = open(ctx["payload"], "rb").read()
+    out = os.path.join(ctx["folder"], "carbon.jpg")
+
+    def run():
+        with open(out, "wb") as f:
+            f.write(payload)
+    return run, out
+
+
+# name -> (stage factory, share of --runs; slow legacy paths run less often)
+STAGES = {
+    "static_layers": (stage_static_layers, 1),
+    "load_background": (stage_load_background, 1),
+    "panel": (stage_panel, 1),
+    "panel_legacy": (stage_panel_legacy, 0.2),
+    "thumb": (stage_thumb, 1),
+    "trim": (stage_trim, 1),
+    "text": (stage_text, 1),
+    "bar_icons": (stage_bar_icons, 1),
+    "save_jpg": (stage_save("jpg", 85), 1),
+    "save_webp": (stage_save("webp", 85), 1),
+    "save_png": (stage_save("png", 95), 0.5),
+    "render_noise_jpg": (stage_render("noise", "jpg", 85), 1),
+    "render_asset_jpg": (stage_render("asset", "jpg", 85), 1),
+    "render_noise_webp": (stage_render("noise", "webp", 85), 1),
+    "carbon_write": (stage_carbon, 1),
+}
+
+
+def _status_kb(field: str):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak():
+    # Linux only: lets VmHWM track this stage instead of the forked parent.
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+def _measure(name: str, ctx: dict, runs: int, conn):
+    try:
+        func, out = STAGES[name][0](ctx)
+        func()  # warm-up, not timed
+        _reset_peak()
+        baseline = _status_kb("VmRSS")
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1000)
+        peak = _status_kb("VmHWM") or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        conn.send({
+            "runs": runs,
+            "p50": percentile(samples, 50),
+            "p90": percentile(samples, 90),
+            "p99": percentile(samples, 99),
+            "max": max(samples),
+            "peak_rss": peak / 1024,
+            "rss_delta": (peak - baseline) / 1024 if baseline else None,
+            "size": os.path.getsize(out) / 1024 if out and os.path.exists(out) else None,
+        })
+    except Exception as e:
+        conn.send({"error": repr(e)})
+    finally:
+        conn.close()
+
+
+def run_stage(name: str, ctx: dict, runs: int) -> dict:
+    fork = multiprocessing.get_context("fork")
+    parent, child = fork.Pipe(duplex=False)
+    proc = fork.Process(target=_measure, args=(name, ctx, runs, child))
+    proc.start()
+    child.close()
+    result = parent.recv()
+    proc.join()
+    return result
+
+
+def fmt(value, spec: str) -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--only", help="comma separated stage names (substring match)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare p50 against a previous --json file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    names = list(STAGES)
+    if args.only:
+        wanted = [w.strip() for w in args.only.split(",") if w.strip()]
+        names = [n for n in names if any(w in n for w in wanted)]
+
+    with tempfile.TemporaryDirectory() as folder:
+        ctx = {"folder": folder, **prepare_sources(folder)}
+        ctx["base"], ctx["bg"] = tr.load_background(ctx["noise"])
+        ctx["payload"] = tr.render_thumb(
+            ctx["noise"], os.path.join(folder, "payload.jpg"), LONG_TITLE, "1.2M views", "4:20", False, "bench", 85
+        )
+
+        legacy = legacy_panel(ctx["bg"].copy())
+        if legacy.tobytes() != tr.static_layers()["gradient"].tobytes():
+            sys.exit("gradient mismatch between legacy and static panel")
+
+        print(f"{'stage':<20}{'runs':>5}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}{'peak MB':>10}{'+RSS MB':>9}{'out KB':>9}")
+        results = {}
+        for name in names:
+            runs = max(1, int(args.runs * STAGES[name][1]))
+            r = results[name] = run_stage(name, ctx, runs)
+            if "error" in r:
+                print(f"{name:<20} failed: {r['error']}")
+                continue
+            print(
+                f"{name:<20}{r['runs']:>5}{r['p50']:>10.2f}{r['p90']:>10.2f}{r['p99']:>10.2f}{r['max']:>10.2f}"
+                f"{fmt(r['peak_rss'], '.1f'):>10}{fmt(r['rss_delta'], '.1f'):>9}{fmt(r['size'], '.1f'):>9}"
+            )
+        print("(latencies in ms)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = []
+        for name, r in results.items():
+            old = baseline.get(name, {}).get("p50")
+            if old and "p50" in r and r["p50"] > old * (1 + args.tolerance):
+                regressions.append(f"{name}: p50 {old:.2f} -> {r['p50']:.2f} ms")
+        if regressions:
+            print("\nRegressions beyond tolerance:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"\nNo stage regressed by more than {args.tolerance:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,9 @@ BOT_TOKEN = getenv("BOT_TOKEN")
 
 # MongoDB connection URI (for storing user & session data)
 MONGO_DB_URI = getenv("MONGO_DB_URI", None)
+DATABASE_BACKEND = getenv("DATABASE_BACKEND", "mongo").lower()  # "mongo", or "sqlite" to keep everything in a local file
+SQLITE_DB_PATH = getenv("SQLITE_DB_PATH", "anonmusic.db")  # Database file used by the sqlite backend
+DB_METRICS = getenv("DB_METRICS", "True").lower() in ("1", "true", "yes")  # Time every database function and storage call for /dbperf
 
 # YouTube streaming proxy and key (used in API backend)
 # Sirf wahi keys list mein jayengi jo empty nahi hain
@@ -35,11 +38,31 @@ MINI_APP =  getenv("MINI_APP", "https://heroku-club.vercel.app")
 
 COOKIES_URL = getenv("COOKIES_URL", None)
 
+# YouTube metadata cache (search results reused across details/title/thumbnail lookups)
+YT_META_CACHE_TTL = int(getenv("YT_META_CACHE_TTL", 3600))  # Entry lifetime (in seconds)
+YT_META_CACHE_SIZE = int(getenv("YT_META_CACHE_SIZE", 2048))  # Max cached lookups
+
+# yt-dlp extraction pool (formats, SoundCloud) kept off the event loop
+EXTRACT_WORKERS = int(getenv("EXTRACT_WORKERS", 2))  # Worker processes
+EXTRACT_CACHE_TTL = int(getenv("EXTRACT_CACHE_TTL", 1800))  # Reuse extracted info for a URL (in seconds)
+EXTRACT_CACHE_SIZE = int(getenv("EXTRACT_CACHE_SIZE", 256))  # Max cached extractions
+
 # Limits and durations
 DURATION_LIMIT_MIN = int(getenv("DURATION_LIMIT", 300))  # Max duration in minutes
 ASSISTANT_LEAVE_TIME = int(getenv("ASSISTANT_LEAVE_TIME", 5400))  # Time after which assistant leaves (in seconds)
 CACHE_DURATION = int(getenv("CACHE_DURATION", 86400))  # Duration to cache files
 CACHE_SLEEP = int(getenv("CACHE_SLEEP", 3600))  # Interval to clean cache
+ONOFF_RELOAD = int(getenv("ONOFF_RELOAD", 60))  # Reload maintenance/logger flags from the database (in seconds, 0 disables)
+SERVED_FLUSH_INTERVAL = int(getenv("SERVED_FLUSH_INTERVAL", 10))  # Write new served users/chats every (in seconds)
+SERVED_SEEN_SIZE = int(getenv("SERVED_SEEN_SIZE", 100000))  # Recently seen ids skipped without a database write
+SERVED_COUNT_TTL = int(getenv("SERVED_COUNT_TTL", 60))  # Reuse served user/chat counts for (in seconds)
+MEDIA_CACHE_SIZE = int(getenv("MEDIA_CACHE_SIZE", 2048))  # Disk budget for downloads/ (in MB)
+
+# Shared HTTP client (keep-alive pool used by all platform fetches)
+HTTP_POOL_LIMIT = int(getenv("HTTP_POOL_LIMIT", 100))  # Max open connections overall
+HTTP_PER_HOST_LIMIT = int(getenv("HTTP_PER_HOST_LIMIT", 10))  # Max open connections per host
+HTTP_DNS_TTL = int(getenv("HTTP_DNS_TTL", 300))  # DNS cache lifetime (in seconds)
+HTTP_KEEPALIVE = int(getenv("HTTP_KEEPALIVE", 60))  # Idle keep-alive time (in seconds)
 
 # Logging & ownership
 LOGGER_ID = int(getenv("LOGGER_ID"))  # Chat ID where logs go
@@ -68,6 +91,34 @@ SPOTIFY_CLIENT_SECRET = getenv("SPOTIFY_CLIENT_SECRET", "c9c63c6fbf2f467c8bc6862
 
 # Playlist track fetch limit
 PLAYLIST_FETCH_LIMIT = int(getenv("PLAYLIST_FETCH_LIMIT", 25))
+PLAYLIST_RESOLVE_CONCURRENCY = int(getenv("PLAYLIST_RESOLVE_CONCURRENCY", 5))  # Parallel track lookups
+PLAYLIST_CACHE_TTL = int(getenv("PLAYLIST_CACHE_TTL", 300))  # Reuse a playlist's track ids (in seconds)
+
+# Prefetch upcoming queued tracks while the current one plays
+PREFETCH_AHEAD = int(getenv("PREFETCH_AHEAD", 1))  # Tracks to download ahead (0 disables)
+PREFETCH_CONCURRENCY = int(getenv("PREFETCH_CONCURRENCY", 2))  # Max prefetch downloads at once (all chats)
+QUEUE_SNAPSHOT_INTERVAL = int(getenv("QUEUE_SNAPSHOT_INTERVAL", 15))  # Save changed play queues every (in seconds, 0 disables saving and resuming)
+QUEUE_RESTORE_CONCURRENCY = int(getenv("QUEUE_RESTORE_CONCURRENCY", 3))  # Calls rejoined at once after a restart
+QUEUE_RESTORE_DELAY = float(getenv("QUEUE_RESTORE_DELAY", 1))  # Seconds between two rejoins, to stay clear of FloodWait
+QUEUE_RESTORE_MAX_AGE = int(getenv("QUEUE_RESTORE_MAX_AGE", 1800))  # Snapshots older than this (in seconds) are dropped, not resumed
+ASSISTANT_HEALTH_WINDOW = int(getenv("ASSISTANT_HEALTH_WINDOW", 600))  # FloodWaits/join failures older than this (in seconds) stop counting against an assistant
+ASSISTANT_FAILURE_LIMIT = int(getenv("ASSISTANT_FAILURE_LIMIT", 3))  # Join failures in a row before new chats avoid an assistant
+
+# Progressive playback: start long tracks and videos before their download finishes
+PROGRESSIVE_PLAYBACK = getenv("PROGRESSIVE_PLAYBACK", "True").lower() in ("1", "true", "yes")  # Start long audio tracks before the download finishes
+PROGRESSIVE_MIN_DURATION = int(getenv("PROGRESSIVE_MIN_DURATION", 600))  # Audio shorter than this (in seconds) waits for the full file
+PROGRESSIVE_BUFFER = int(getenv("PROGRESSIVE_BUFFER", 1024))  # Data on disk before playback starts (in KB)
+PROGRESSIVE_STALL = int(getenv("PROGRESSIVE_STALL", 10))  # Seconds without new data before giving up on the partial file
+
+# Now-playing thumbnail rendering, done in worker processes
+THUMB_WORKERS = int(getenv("THUMB_WORKERS", 2))  # Render processes
+THUMB_QUEUE_SIZE = int(getenv("THUMB_QUEUE_SIZE", 16))  # Pending renders before falling back to the raw thumbnail
+THUMB_RENDER_TIMEOUT = int(getenv("THUMB_RENDER_TIMEOUT", 30))  # Give up on a render after this long (in seconds)
+THUMB_WAIT = int(getenv("THUMB_WAIT", 3))  # Now-playing waits this long before sending the raw thumbnail
+THUMB_FORMAT = getenv("THUMB_FORMAT", "jpg")  # Card format: jpg, webp or png
+THUMB_QUALITY = int(getenv("THUMB_QUALITY", 85))  # jpg/webp encoder quality
+THUMB_CACHE_SIZE = int(getenv("THUMB_CACHE_SIZE", 100))  # Disk budget for rendered cards in cache/ (in MB)
+THUMB_CACHE_COUNT = int(getenv("THUMB_CACHE_COUNT", 1000))  # Max rendered cards kept
 
 # File size limits in bytes (check https://www.gbmb.org/mb-to-bytes)
 TG_AUDIO_FILESIZE_LIMIT = int(getenv("TG_AUDIO_FILESIZE_LIMIT", 204857600))  # ~195 MB
@@ -88,7 +139,6 @@ BANNED_USERS = filters.user()
 adminlist = {}
 lyrical = {}
 votemode = {}
-autoclean = []
 confirmer = {}
 file_cache: dict[str, float] = {}
 
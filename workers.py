@@ -0,0 +1,33 @@
+"""Entry points for the process pools in AnonMusic.
+
+The pools start their workers with "spawn": forking the bot once pyrogram,
+ntgcalls and the database client are running their threads can leave a child
+stuck on a lock held at fork time. A spawned worker imports the functions it
+runs by module name, so they live here, outside the AnonMusic package, whose
+import would start the whole bot in every worker.
+"""
+
+import importlib.util
+import os
+
+_renderer = None
+
+
+def extract_info(url: str, opts: dict, download: bool) -> dict:
+    # The returned dict crosses back to the bot, so it has to be picklable.
+    from yt_dlp import YoutubeDL
+
+    with YoutubeDL(opts) as ydl:
+        info = ydl.extract_info(url, download=download)
+        return ydl.sanitize_info(info)
+
+
+def render_thumb(*args):
+    """`AnonMusic/utils/thumbrender.render_thumb`, loaded by path like bench/ does."""
+    global _renderer
+    if _renderer is None:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "AnonMusic", "utils", "thumbrender.py")
+        spec = importlib.util.spec_from_file_location("thumbrender", path)
+        _renderer = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(_renderer)
+    return _renderer.render_thumb(*args)